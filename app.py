@@ -3,10 +3,28 @@ import json
 import os
 import requests
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from datetime import date, datetime
+from typing import Collection, Dict, List, NamedTuple, Optional, Tuple
 import random
 import html
+import re
+import uuid
+import pickle
+import threading
+import hmac
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from question_bank import DIFFICULTY_RATINGS, QuestionSnapshot
+from models import ANSWER_LETTERS, Question, UserProgress, intern_subject, local_today
+import storage
+import procedural
+from focus_scheduler import BREAK_DURATION, FOCUS_DURATION, FocusScheduler
+from prefetch import Prefetcher
+from profiler import RerunProfiler
+import rollover
+from catalog import CatalogWatcher
+from quest_pipeline import QuestionCache, QuestionSource, QuestResult, run_pipeline
+from recommender import COHORT_KEY
 
 # Configure Streamlit page
 st.set_page_config(
@@ -16,6 +34,38 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# 🔬 OPERATOR PROFILING
+# With STUDYQUEST_PROFILE_TOKEN set, opening ?profile=N&profile_token=<token> profiles this
+# session's next N reruns into STUDYQUEST_PROFILE_DIR. Without it this is one env lookup per rerun.
+def begin_rerun_profile():
+    previous = st.session_state.pop('active_profiler', None)
+    if previous:
+        previous.stop()  # the last rerun ended early (st.rerun / st.stop)
+    
+    token = os.getenv("STUDYQUEST_PROFILE_TOKEN")
+    if token and "profile" in st.query_params:
+        if hmac.compare_digest(st.query_params.get("profile_token", ""), token):
+            try:
+                st.session_state.profile_reruns_left = max(0, int(st.query_params["profile"]))
+            except ValueError:
+                pass
+        del st.query_params["profile"]
+        st.query_params.pop("profile_token", None)
+    
+    if st.session_state.get('profile_reruns_left', 0) > 0:
+        st.session_state.profile_reruns_left -= 1
+        label = f"{datetime.now():%Y%m%d-%H%M%S}-{st.session_state.get('user_id', 'new')}-{uuid.uuid4().hex[:4]}"
+        st.session_state.active_profiler = RerunProfiler(
+            label, os.getenv("STUDYQUEST_PROFILE_DIR", "profiles"), root_file=__file__
+        ).start()
+
+def end_rerun_profile():
+    profiler = st.session_state.pop('active_profiler', None)
+    if profiler:
+        profiler.stop()
+
+begin_rerun_profile()
+
 # Custom CSS for gamified UI
 st.markdown("""
 <style>
@@ -92,32 +142,63 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Identify the user so progress survives reloads (?user=<id> in the URL)
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = st.query_params.get("user") or uuid.uuid4().hex
+    st.query_params["user"] = st.session_state.user_id
+
+# Per browser session (two tabs of one user are two sessions) - scopes work that can be cancelled
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 # Initialize session state
 if 'user_data' not in st.session_state:
-    st.session_state.user_data = {
-        'xp': 0,
-        'total_xp': 0,
-        'streak': 0,
-        'last_activity': None,
-        'badges': [],
-        'subjects_studied': {},
-        'daily_xp': 0,
-        'timer_active': False,
-        'timer_start': None,
-        'break_time': False
-    }
+    with storage.open_db() as conn:
+        st.session_state.user_data = storage.load_progress(conn, st.session_state.user_id) or UserProgress()
+
+# "What to study next", precomputed nightly by recommender.py - one primary-key lookup per session
+if 'recommendations' not in st.session_state:
+    with storage.open_db() as conn:
+        st.session_state.recommendations = (storage.load_recommendations(conn, st.session_state.user_id)
+                                            or storage.load_recommendations(conn, COHORT_KEY) or {})
 
-# Load user data from session state
-def save_user_data(data):
+# Save user data to session state and the database
+def save_user_data(data: UserProgress):
     st.session_state.user_data = data
+    with storage.open_db() as conn:
+        storage.save_progress(conn, st.session_state.user_id, data)
+
+# Streaks and daily XP roll over at the browser's local midnight
+browser_timezone = st.context.timezone
+if browser_timezone and browser_timezone != st.session_state.user_data.timezone:
+    st.session_state.user_data.timezone = browser_timezone
+    if st.session_state.user_data.last_activity:
+        save_user_data(st.session_state.user_data)
+
+def log_event(kind: str, subject: str, question: Optional[str] = None,
+              correct: Optional[bool] = None, xp: int = 0):
+    """Append to the learning event history (exported by import_export.py)"""
+    log_events([(kind, subject, question, correct, xp)])
+
+def log_events(events: List[tuple]):
+    """Append several (kind, subject, question, correct, xp) events in one transaction"""
+    with storage.open_db() as conn:
+        storage.record_events(conn, st.session_state.user_id, events)
 
 # 🤖 AI INTEGRATION - FREE COHERE API
-def call_cohere_api(prompt: str) -> Optional[str]:
+COHERE_API_URL = os.getenv("COHERE_API_URL", "https://api.cohere.ai/v1/chat")
+
+def call_cohere_api(prompt: str, deadline: Optional[float] = None, max_tokens: int = 150,
+                    latency: Optional["LatencyTracker"] = None,
+                    executor: Optional[ThreadPoolExecutor] = None) -> Optional[str]:
     """
     🚀 FREE AI INTEGRATION using Cohere's free trial API
     - 1000 free API calls per month
     - No credit card required for trial
     - High-quality text generation
+    With a deadline and an executor the request is hedged and abandoned once the deadline passes.
+    `latency` and `executor` come from get_ai_latency_tracker() / get_ai_executor() on the
+    script thread; worker threads must be handed them, not look them up.
     """
     cohere_api_key = os.getenv("COHERE_API_KEY")
     
@@ -132,627 +213,704 @@ def call_cohere_api(prompt: str) -> Optional[str]:
     payload = {
         "message": prompt,
         "model": "command-r",  # Free tier model
-        "max_tokens": 150,
+        "max_tokens": max_tokens,
         "temperature": 0.7
     }
     
+    if deadline is None:
+        return post_cohere(headers, payload, timeout=10, latency=latency)
+    if executor is None:
+        return post_cohere(headers, payload, timeout=max(0.0, deadline - time.monotonic()), latency=latency)
+    return hedged_cohere_request(headers, payload, deadline, executor, latency)
+
+def post_cohere(headers: Dict, payload: Dict, timeout: float,
+                latency: Optional["LatencyTracker"] = None) -> Optional[str]:
+    """Single Cohere chat request; successful latencies feed the hedging percentile"""
     try:
+        started = time.monotonic()
         response = requests.post(
-            "https://api.cohere.ai/v1/chat", 
+            COHERE_API_URL, 
             headers=headers, 
             json=payload,
-            timeout=10
+            timeout=timeout
         )
         
         if response.status_code == 200:
             result = response.json()
+            if latency is not None:
+                latency.record(time.monotonic() - started)
             return result.get("text", "").strip()
         else:
             return None
     except Exception as e:
         return None
 
+# ⚡ LATENCY-AWARE AI REQUESTS
+QUEST_DEADLINE_SECONDS = float(os.getenv("QUEST_DEADLINE_SECONDS", "6"))
+DEFAULT_HEDGE_DELAY = 2.0
+HEDGE_PERCENTILE = 90
+
+class LatencyTracker:
+    """Rolling window of recent request latencies shared by every session in the process"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent: float, default: float, min_samples: int = 10) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < min_samples:
+            return default
+        return samples[min(len(samples) - 1, int(len(samples) * percent / 100))]
+
+@st.cache_resource
+def get_ai_latency_tracker() -> LatencyTracker:
+    return LatencyTracker()
+
+def hedge_delay(latency: Optional[LatencyTracker]) -> float:
+    return latency.percentile(HEDGE_PERCENTILE, DEFAULT_HEDGE_DELAY) if latency is not None else DEFAULT_HEDGE_DELAY
+
+@st.cache_resource
+def get_ai_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="cohere")
+
+def hedged_cohere_request(headers: Dict, payload: Dict, deadline: float, executor: ThreadPoolExecutor,
+                          latency: Optional[LatencyTracker] = None) -> Optional[str]:
+    """
+    ⚡ HEDGED REQUEST
+    Sends a second identical request if the first hasn't answered by the observed p90
+    latency (or failed early), returns whichever succeeds first and gives up at the
+    deadline (time.monotonic() based). Losing requests are cancelled if still queued;
+    ones already in flight are abandoned and time out by the deadline on their own.
+    """
+    remaining = lambda: deadline - time.monotonic()
+    if remaining() <= 0:
+        return None
+    
+    hedge_at = time.monotonic() + hedge_delay(latency)
+    pending = {executor.submit(post_cohere, headers, payload, remaining(), latency)}
+    hedged = False
+    try:
+        while remaining() > 0:
+            wait_for = remaining() if hedged else min(remaining(), max(0, hedge_at - time.monotonic()))
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    return future.result()
+            if not hedged and (not pending or time.monotonic() >= hedge_at) and remaining() > 0:
+                pending.add(executor.submit(post_cohere, headers, payload, remaining(), latency))
+                hedged = True
+            elif not pending:
+                return None
+        return None
+    finally:
+        for future in pending:
+            future.cancel()
+
 # 🧠 INTELLIGENT QUESTION GENERATION
-def generate_ai_questions(topic: str, difficulty: str) -> List[Dict]:
+QUESTION_FORMAT = "Format each as: Question: [question text] A) [option] B) [option] C) [option] D) [option] Answer: [correct letter]"
+REPAIR_TOKENS_PER_QUESTION = 60
+MAX_REPAIR_ATTEMPTS = 2
+OPTION_PATTERN = re.compile(r"(?:^|\s)([A-D])\)\s*")
+ANSWER_PATTERN = re.compile(r"Answer:\s*\(?([A-D])\b")  # a lone letter - not "Answer: Because..."
+
+def generate_ai_questions(topic: str, difficulty: str, deadline: Optional[float] = None, count: int = 3,
+                          latency: Optional[LatencyTracker] = None,
+                          executor: Optional[ThreadPoolExecutor] = None,
+                          cache: Optional[QuestionCache] = None,
+                          repair_by: Optional[float] = None) -> List[Question]:
     """
     🎯 AI-POWERED QUESTION GENERATION
-    Uses Cohere API to create relevant, subject-specific questions
+    Uses Cohere API to create relevant, subject-specific questions.
+    Questions that fail to parse are re-requested on their own with a smaller
+    token budget, as long as the expected latency still fits before `repair_by` (the
+    pipeline's patience point, after which a late repair would be thrown away) or the deadline.
+    Returns what it has (possibly []) - the quest pipeline tops up from local sources.
+    Safe to call from pipeline threads, given the tracker, executor and cache resolved on the script thread.
     """
     
-    # Try AI generation first
-    ai_questions = []
     cohere_response = call_cohere_api(
-        f"Create 3 {difficulty} level multiple choice questions about {topic}. "
-        f"Format each as: Question: [question text] A) [option] B) [option] C) [option] D) [option] Answer: [correct letter]"
+        f"Create {count} {difficulty} level multiple choice questions about {topic}. {QUESTION_FORMAT}",
+        deadline=deadline,
+        max_tokens=max(150, REPAIR_TOKENS_PER_QUESTION * count),
+        latency=latency,
+        executor=executor
     )
+    if not cohere_response:
+        return []
+    ai_questions = parse_ai_questions(cohere_response, topic, difficulty)[:count]
+    repair_by = deadline if repair_by is None else repair_by
     
-    if cohere_response:
-        ai_questions = parse_ai_questions(cohere_response, topic, difficulty)
-        if ai_questions:
-            st.markdown('<div class="ai-status">🤖 AI Generated Questions!</div>', unsafe_allow_html=True)
-            return ai_questions
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        missing = count - len(ai_questions)
+        if not missing or (repair_by is not None and repair_by - time.monotonic() < hedge_delay(latency)):
+            break
+        asked = "; ".join(question.question for question in ai_questions)
+        cohere_response = call_cohere_api(
+            f"Create {missing} more {difficulty} level multiple choice "
+            f"question{'s' if missing > 1 else ''} about {topic}"
+            + (f", different from: {asked}" if asked else "") + f". {QUESTION_FORMAT}",
+            deadline=deadline,
+            max_tokens=REPAIR_TOKENS_PER_QUESTION * missing,
+            latency=latency,
+            executor=executor
+        )
+        known = {question.question for question in ai_questions}
+        repaired = [question for question in parse_ai_questions(cohere_response or "", topic, difficulty)
+                    if question.question not in known]
+        ai_questions += repaired[:missing]
     
-    # Enhanced fallback with PERFECT topic matching
-    return get_subject_specific_questions(topic, difficulty)
+    if cache is not None:
+        cache.put((topic.lower(), difficulty), ai_questions)
+    return ai_questions
 
-def parse_ai_questions(ai_text: str, topic: str, difficulty: str) -> List[Dict]:
-    """Parse AI-generated text into structured questions"""
-    try:
-        questions = []
-        sections = ai_text.split("Question:")
-        
-        base_xp = 40 if difficulty == "easy" else 50 if difficulty == "medium" else 60
-        
-        for section in sections[1:]:  # Skip first empty section
-            lines = section.strip().split('\n')
-            if len(lines) >= 6:  # Need question + 4 options + answer
-                question_text = lines[0].strip()
-                options = []
-                answer = "A"
-                
-                for line in lines[1:]:
-                    line = line.strip()
-                    if line.startswith(('A)', 'B)', 'C)', 'D)')):
-                        options.append(line)
-                    elif line.startswith('Answer:'):
-                        answer = line.split(':')[1].strip()
-                
-                if len(options) == 4 and question_text:
-                    questions.append({
-                        "question": question_text,
-                        "options": options,
-                        "answer": answer,
-                        "hint": f"Think about the key concepts in {topic}",
-                        "xp": base_xp + 10  # Bonus for AI questions
-                    })
-        
-        return questions[:3]  # Return max 3 questions
-    except:
-        return []
+def parse_ai_question(section: str, topic: str, difficulty: str) -> Optional[Question]:
+    """Parse one 'Question:' section; options may be on separate lines or all on one line"""
+    answer_match = ANSWER_PATTERN.search(section)
+    if not answer_match:
+        return None
+    parts = OPTION_PATTERN.split(section[:answer_match.start()])
+    question_text, letters, texts = parts[0].strip(), parts[1::2], [text.strip() for text in parts[2::2]]
+    if not question_text or letters != list(ANSWER_LETTERS) or not all(texts):
+        return None
+    
+    base_xp = 40 if difficulty == "easy" else 50 if difficulty == "medium" else 60
+    return Question(
+        question=question_text,
+        options=tuple(f"{letter}) {text}" for letter, text in zip(letters, texts)),
+        answer=ANSWER_LETTERS.index(answer_match.group(1)),
+        hint=placeholder_hint(topic),
+        xp=base_xp + 10,  # Bonus for AI questions
+        rating=DIFFICULTY_RATINGS.get(difficulty, DEFAULT_SKILL)
+    )
 
-# 📚 ENHANCED SUBJECT-SPECIFIC QUESTIONS
-def get_subject_specific_questions(topic: str, difficulty: str) -> List[Dict]:
+def parse_ai_questions(ai_text: str, topic: str, difficulty: str) -> List[Question]:
+    """Parse AI-generated text into structured questions, keeping every section that is well-formed"""
+    questions = []
+    for section in ai_text.split("Question:")[1:]:  # Skip text before the first question
+        question = parse_ai_question(section, topic, difficulty)
+        if question:
+            questions.append(question)
+    return questions
+
+# 🔮 AI HINTS & EXPLANATIONS - prefetched while the user reads the quest
+class QuestionNotes(NamedTuple):
+    hint: str
+    explanation: str
+
+def placeholder_hint(topic: str) -> str:
+    return f"Think about the key concepts in {topic}"
+
+def is_placeholder_hint(hint: str, topic: str) -> bool:
+    # Cached AI questions carry the hint of whichever casing of the topic generated them
+    return hint.lower() == placeholder_hint(topic).lower()
+
+def notes_key(question: Question, topic: str) -> Tuple[str, str]:
+    """Prefetch key, shared by every session - the same cached AI question only costs one call"""
+    return topic.lower(), question.question
+
+def notes_group(quest_id: str) -> str:
+    """Cancellation group, scoped to this session: a cancel only withdraws this session's interest"""
+    return f"{st.session_state.session_id}:{quest_id}"
+
+@st.cache_resource
+def get_notes_prefetcher() -> Prefetcher:
+    # Own small pool, so background prefetch never delays quest generation
+    return Prefetcher(ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch"))
+
+def fetch_question_notes(question: Question, topic: str, latency: Optional[LatencyTracker] = None) -> Optional[QuestionNotes]:
+    """One Cohere call for a question's hint and the explanation shown after a wrong answer"""
+    cohere_response = call_cohere_api(
+        f"For this {topic} multiple choice question: {question.question} "
+        f"Options: {' '.join(question.options)} Correct answer: {question.correct_option}\n"
+        f"Reply in two lines. Hint: [a hint that does not reveal the answer] "
+        f"Explanation: [why the correct answer is right]",
+        latency=latency
+    )
+    if not cohere_response:
+        return None
+    
+    fields = {}
+    for line in cohere_response.split('\n'):
+        label, _, text = line.partition(':')
+        if label.strip().lower() in ("hint", "explanation") and text.strip():
+            fields[label.strip().lower()] = text.strip()
+    if len(fields) < 2:
+        return None
+    return QuestionNotes(fields["hint"], fields["explanation"])
+
+def prefetch_question_notes(quest_id: str, quest_data: List[Question], topic: str):
+    """Speculatively fetch notes for every question that only has the placeholder hint"""
+    if not os.getenv("COHERE_API_KEY"):
+        return
+    prefetcher = get_notes_prefetcher()
+    latency = get_ai_latency_tracker()  # resolved here; the fetches run on the prefetch pool
+    for question in quest_data:
+        if is_placeholder_hint(question.hint, topic):
+            prefetcher.submit(notes_group(quest_id), notes_key(question, topic),
+                              lambda question=question: fetch_question_notes(question, topic, latency))
+
+def get_question_notes(question: Question, topic: str) -> QuestionNotes:
+    """Prefetched notes if they're ready, otherwise the question's own hint - never waits"""
+    notes = get_notes_prefetcher().get(notes_key(question, topic))
+    return notes or QuestionNotes(question.hint, question.hint)
+
+# 📚 CURATED CONTENT - questions, badges, quotes, facts and tips (see catalog.py)
+@st.cache_resource
+def get_catalog_watcher() -> CatalogWatcher:
+    """One watcher per process; edits to content/catalog.json go live without a restart"""
+    return CatalogWatcher().start()
+
+# Pin one catalog version for the whole rerun, including the quest pipeline's worker threads
+catalog = get_catalog_watcher().current()
+
+def get_curated_questions(topic: str, difficulty: str) -> List[Question]:
+    """Curated questions for the subject the topic matches, or study-skills questions about it"""
+    return catalog.questions(topic, difficulty)
+
+@st.cache_resource
+def load_question_snapshot() -> Optional[QuestionSnapshot]:
     """
-    🎯 PERFECT TOPIC MATCHING with comprehensive question database
-    Each subject gets properly matched questions with relevant hints
+    📦 Compiled question bank (see question_bank.py), mmapped once per process
+    so every session and worker shares the same read-only pages
     """
-    topic_lower = topic.lower()
-    base_xp = 40 if difficulty == "easy" else 50 if difficulty == "medium" else 60
-    
-    # 💻 COMPUTER SCIENCE & PROGRAMMING
-    if any(word in topic_lower for word in ['computer', 'programming', 'coding', 'python', 'java', 'javascript', 'html', 'css', 'software', 'algorithm', 'data structure']):
-        if difficulty == "easy":
-            questions = [
-                {
-                    "question": "What does HTML stand for?",
-                    "options": ["A) Hyper Text Markup Language", "B) High Tech Modern Language", "C) Home Tool Markup Language", "D) Hyperlink Text Markup Language"],
-                    "answer": "A",
-                    "hint": "It's the standard language for creating web pages",
-                    "xp": base_xp
-                },
-                {
-                    "question": "Which of these is a programming language?",
-                    "options": ["A) Python", "B) Chrome", "C) Windows", "D) Microsoft"],
-                    "answer": "A",
-                    "hint": "It's named after a type of snake and is popular for beginners",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is a variable in programming?",
-                    "options": ["A) A fixed number", "B) A container that stores data", "C) A type of computer", "D) An error message"],
-                    "answer": "B",
-                    "hint": "Think of it as a labeled box that can hold different values",
-                    "xp": base_xp
-                }
-            ]
-        elif difficulty == "medium":
-            questions = [
-                {
-                    "question": "Which symbol is used for comments in Python?",
-                    "options": ["A) //", "B) #", "C) /* */", "D) --"],
-                    "answer": "B",
-                    "hint": "It's also called a hash symbol and makes text invisible to the program",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is the time complexity of linear search?",
-                    "options": ["A) O(1)", "B) O(log n)", "C) O(n)", "D) O(n²)"],
-                    "answer": "C",
-                    "hint": "You might need to check every element in the worst case",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What does CSS control in web development?",
-                    "options": ["A) Content structure", "B) Visual styling and layout", "C) Database connections", "D) Server logic"],
-                    "answer": "B",
-                    "hint": "It makes websites look beautiful with colors, fonts, and layouts",
-                    "xp": base_xp
-                }
-            ]
-        else:  # hard
-            questions = [
-                {
-                    "question": "What is the space complexity of merge sort?",
-                    "options": ["A) O(1)", "B) O(log n)", "C) O(n)", "D) O(n log n)"],
-                    "answer": "C",
-                    "hint": "Consider the additional memory needed for the merge process",
-                    "xp": base_xp
-                },
-                {
-                    "question": "In object-oriented programming, what is polymorphism?",
-                    "options": ["A) Having multiple classes", "B) Objects taking multiple forms", "C) Multiple inheritance", "D) Code reusability"],
-                    "answer": "B",
-                    "hint": "One interface, many implementations - like how '+' works for numbers and strings",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is a hash collision in computer science?",
-                    "options": ["A) Two keys producing the same hash value", "B) A network error", "C) A syntax error", "D) A type mismatch"],
-                    "answer": "A",
-                    "hint": "When different inputs produce the same output in a hash function",
-                    "xp": base_xp
-                }
-            ]
-    
-    # 🧮 MATHEMATICS
-    elif any(word in topic_lower for word in ['math', 'algebra', 'geometry', 'calculus', 'arithmetic', 'trigonometry', 'statistics']):
-        if difficulty == "easy":
-            questions = [
-                {
-                    "question": "What is 15% of 200?",
-                    "options": ["A) 25", "B) 30", "C) 35", "D) 40"],
-                    "answer": "B",
-                    "hint": "Convert 15% to decimal (0.15) and multiply by 200",
-                    "xp": base_xp
-                },
-                {
-                    "question": "If a rectangle has length 8 and width 5, what is its area?",
-                    "options": ["A) 13", "B) 26", "C) 40", "D) 45"],
-                    "answer": "C",
-                    "hint": "Area of rectangle = length × width",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is 7 × 9?",
-                    "options": ["A) 61", "B) 63", "C) 65", "D) 67"],
-                    "answer": "B",
-                    "hint": "Think: (7 × 10) - 7 = 70 - 7",
-                    "xp": base_xp
-                }
-            ]
-        elif difficulty == "medium":
-            questions = [
-                {
-                    "question": "If 3x - 7 = 14, what is the value of x?",
-                    "options": ["A) x = 7", "B) x = 5", "C) x = 9", "D) x = 3"],
-                    "answer": "A",
-                    "hint": "Add 7 to both sides first: 3x = 21, then divide by 3",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is the area of a circle with radius 6?",
-                    "options": ["A) 12π", "B) 36π", "C) 18π", "D) 24π"],
-                    "answer": "B",
-                    "hint": "Use the formula A = πr², so A = π × 6²",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is the slope of the line y = 4x - 2?",
-                    "options": ["A) 4", "B) -2", "C) 2", "D) 6"],
-                    "answer": "A",
-                    "hint": "In y = mx + b form, m is the slope coefficient",
-                    "xp": base_xp
-                }
-            ]
-        else:  # hard
-            questions = [
-                {
-                    "question": "What is the derivative of x³ + 2x² - 5x + 3?",
-                    "options": ["A) 3x² + 4x - 5", "B) x⁴ + 2x³ - 5x² + 3x", "C) 3x² + 2x - 5", "D) 3x + 4"],
-                    "answer": "A",
-                    "hint": "Use power rule: d/dx(xⁿ) = nxⁿ⁻¹ for each term",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is the integral of 2x dx?",
-                    "options": ["A) x² + C", "B) 2x² + C", "C) x²/2 + C", "D) 2"],
-                    "answer": "A",
-                    "hint": "∫2x dx = 2∫x dx = 2(x²/2) + C = x² + C",
-                    "xp": base_xp
-                }
-            ]
-    
-    # 🔬 SCIENCE (Biology, Chemistry, Physics)
-    elif any(word in topic_lower for word in ['science', 'biology', 'chemistry', 'physics', 'anatomy', 'cell', 'molecule', 'atom']):
-        if difficulty == "easy":
-            questions = [
-                {
-                    "question": "What gas do plants absorb during photosynthesis?",
-                    "options": ["A) Oxygen", "B) Nitrogen", "C) Carbon dioxide", "D) Hydrogen"],
-                    "answer": "C",
-                    "hint": "Plants use this gas along with sunlight and water to make glucose",
-                    "xp": base_xp
-                },
-                {
-                    "question": "How many chambers does a human heart have?",
-                    "options": ["A) 2", "B) 3", "C) 4", "D) 5"],
-                    "answer": "C",
-                    "hint": "Think about the left and right sides, each with two chambers",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is the chemical symbol for oxygen?",
-                    "options": ["A) O", "B) Ox", "C) Oy", "D) O2"],
-                    "answer": "A",
-                    "hint": "It's just the first letter of the element name",
-                    "xp": base_xp
-                }
-            ]
-        elif difficulty == "medium":
-            questions = [
-                {
-                    "question": "What is the powerhouse of the cell?",
-                    "options": ["A) Nucleus", "B) Mitochondria", "C) Ribosome", "D) Cytoplasm"],
-                    "answer": "B",
-                    "hint": "This organelle produces ATP energy through cellular respiration",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is the chemical formula for water?",
-                    "options": ["A) H₂O", "B) CO₂", "C) O₂", "D) H₂SO₄"],
-                    "answer": "A",
-                    "hint": "Two hydrogen atoms bonded with one oxygen atom",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What force keeps planets in orbit around the sun?",
-                    "options": ["A) Magnetic force", "B) Gravitational force", "C) Electric force", "D) Nuclear force"],
-                    "answer": "B",
-                    "hint": "This force depends on mass and distance between objects",
-                    "xp": base_xp
-                }
-            ]
-        else:  # hard
-            questions = [
-                {
-                    "question": "What is the pH of pure water at 25°C?",
-                    "options": ["A) 6", "B) 7", "C) 8", "D) 14"],
-                    "answer": "B",
-                    "hint": "Pure water is neutral on the pH scale",
-                    "xp": base_xp
-                },
-                {
-                    "question": "Which process converts mRNA into proteins?",
-                    "options": ["A) Transcription", "B) Translation", "C) Replication", "D) Mutation"],
-                    "answer": "B",
-                    "hint": "This process happens at ribosomes in the cytoplasm",
-                    "xp": base_xp
-                }
-            ]
-    
-    # 📚 HISTORY
-    elif any(word in topic_lower for word in ['history', 'historical', 'war', 'ancient', 'medieval', 'civilization', 'empire']):
-        if difficulty == "easy":
-            questions = [
-                {
-                    "question": "Who was the first President of the United States?",
-                    "options": ["A) Thomas Jefferson", "B) John Adams", "C) George Washington", "D) Benjamin Franklin"],
-                    "answer": "C",
-                    "hint": "He led the Continental Army and is on the $1 bill",
-                    "xp": base_xp
-                },
-                {
-                    "question": "In which year did World War II end?",
-                    "options": ["A) 1944", "B) 1945", "C) 1946", "D) 1947"],
-                    "answer": "B",
-                    "hint": "This was when atomic bombs were dropped and Japan surrendered",
-                    "xp": base_xp
-                }
-            ]
-        elif difficulty == "medium":
-            questions = [
-                {
-                    "question": "Which empire built Machu Picchu?",
-                    "options": ["A) Aztec", "B) Maya", "C) Inca", "D) Roman"],
-                    "answer": "C",
-                    "hint": "This South American empire was centered in modern-day Peru",
-                    "xp": base_xp
-                },
-                {
-                    "question": "The Renaissance began in which country?",
-                    "options": ["A) France", "B) England", "C) Spain", "D) Italy"],
-                    "answer": "D",
-                    "hint": "Think of cities like Florence, Venice, and Rome during the 14th century",
-                    "xp": base_xp
-                }
-            ]
-        else:  # hard
-            questions = [
-                {
-                    "question": "Which treaty ended World War I?",
-                    "options": ["A) Treaty of Versailles", "B) Treaty of Paris", "C) Treaty of Vienna", "D) Treaty of Westphalia"],
-                    "answer": "A",
-                    "hint": "Signed in 1919, it imposed harsh terms on Germany",
-                    "xp": base_xp
-                }
-            ]
+    path = os.getenv("QUESTION_BANK_SNAPSHOT", "question_bank.snap")
+    if not os.path.exists(path):
+        return None
+    return QuestionSnapshot(path)
+
+# 📈 ADAPTIVE DIFFICULTY ENGINE
+DEFAULT_SKILL = 1200
+SKILL_K_FACTOR = 32
+ADAPTIVE_WINDOW = 150
+
+def skill_subject(topic: str) -> str:
+    """
+    The subject a topic's skill rating is kept under, so "Algebra", "algebra" and "Mathematics"
+    share one estimate: the catalog subject, else the question bank subject, else the topic itself
+    """
+    subject = catalog.find_subject(topic)
+    if subject:
+        return intern_subject(subject.name)
+    snapshot = load_question_snapshot()
+    bank_subject = snapshot.find_subject(topic) if snapshot else None
+    return intern_subject(bank_subject or topic.lower())
+
+def get_skill(topic: str) -> float:
+    return st.session_state.user_data.skill.get(skill_subject(topic), DEFAULT_SKILL)
+
+def update_skill(topic: str, question_rating: float, correct: bool):
+    """Elo-style O(1) update of the user's skill estimate for one answer"""
+    skill = get_skill(topic)
+    expected = 1 / (1 + 10 ** ((question_rating - skill) / 400))
+    st.session_state.user_data.skill[skill_subject(topic)] = round(skill + SKILL_K_FACTOR * (int(correct) - expected), 1)
+
+def generate_adaptive_quest(topic: str, count: int = 3) -> List[Question]:
+    """
+    🎯 ADAPTIVE QUEST
+    Serves curated questions whose rating matches the user's skill in this topic,
+    widening the rating window until enough questions are found (no AI calls)
+    """
+    skill = get_skill(topic)
+    snapshot = load_question_snapshot()
+    subject = snapshot.find_subject(topic) if snapshot else None
+    if subject:
+        window = ADAPTIVE_WINDOW
+        total = snapshot.count(subject)
+        record_ids = snapshot.range(subject, skill - window, skill + window)
+        while len(record_ids) < count and len(record_ids) < total:
+            window *= 2
+            record_ids = snapshot.range(subject, skill - window, skill + window)
+        return [snapshot.question(record_id) for record_id in random.sample(record_ids, min(count, len(record_ids)))]
     
-    # 🔤 ENGLISH & LITERATURE
-    elif any(word in topic_lower for word in ['english', 'literature', 'grammar', 'writing', 'poetry', 'shakespeare', 'novel']):
-        if difficulty == "easy":
-            questions = [
-                {
-                    "question": "What is the plural of 'child'?",
-                    "options": ["A) Childs", "B) Children", "C) Childes", "D) Childs'"],
-                    "answer": "B",
-                    "hint": "This is an irregular plural form in English",
-                    "xp": base_xp
-                },
-                {
-                    "question": "Which word is a synonym for 'big'?",
-                    "options": ["A) Small", "B) Large", "C) Tiny", "D) Little"],
-                    "answer": "B",
-                    "hint": "Look for a word that means the same as 'big'",
-                    "xp": base_xp
-                }
-            ]
-        elif difficulty == "medium":
-            questions = [
-                {
-                    "question": "What is a metaphor?",
-                    "options": ["A) A comparison using 'like' or 'as'", "B) A direct comparison without 'like' or 'as'", "C) A repeated sound", "D) An exaggeration"],
-                    "answer": "B",
-                    "hint": "Unlike similes, metaphors make direct comparisons (e.g., 'Life is a journey')",
-                    "xp": base_xp
-                },
-                {
-                    "question": "Who wrote 'Romeo and Juliet'?",
-                    "options": ["A) Charles Dickens", "B) William Shakespeare", "C) Jane Austen", "D) Mark Twain"],
-                    "answer": "B",
-                    "hint": "This playwright is known as the Bard of Avon",
-                    "xp": base_xp
-                }
-            ]
-        else:  # hard
-            questions = [
-                {
-                    "question": "What literary device is used in 'The wind whispered secrets'?",
-                    "options": ["A) Metaphor", "B) Simile", "C) Personification", "D) Alliteration"],
-                    "answer": "C",
-                    "hint": "The wind is given human characteristics (whispering)",
-                    "xp": base_xp
-                }
-            ]
+    index = catalog.index(topic)
+    window = ADAPTIVE_WINDOW
+    candidates = index.range(skill - window, skill + window)
+    while len(candidates) < count and len(candidates) < len(index):
+        window *= 2
+        candidates = index.range(skill - window, skill + window)
+    return random.sample(candidates, min(count, len(candidates)))
+
+# 🔀 QUESTION SOURCES
+QUEST_SIZE = 3
+MAX_QUEST_LENGTH = 50
+QUEST_PATIENCE_SECONDS = float(os.getenv("QUEST_PATIENCE_SECONDS", "4"))
+SOURCE_LABELS = {
+    "ai": "🤖 AI",
+    "cached": "♻️ Cached AI",
+    "procedural": "🧮 Generated",
+    "bank": "📦 Question bank",
+    "curated": "📚 Curated",
+    "adaptive": "📈 Adaptive",
+    "review": "🔁 Review",
+}
+
+@st.cache_resource
+def get_ai_question_cache() -> QuestionCache:
+    return QuestionCache()
+
+@st.cache_resource
+def get_pipeline_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=32, thread_name_prefix="quest-source")
+
+def build_question_sources(topic: str, difficulty: str, patience_at: Optional[float] = None) -> List[QuestionSource]:
+    """
+    Every source that can serve this topic, best first. Math / algorithm topics are
+    generated locally, so they never spend an AI call. AI repairs stop at `patience_at`.
+    """
+    sources = []
+    procedural_subject = procedural.find_subject(topic)
+    ai_cache = get_ai_question_cache()  # cache_resource getters stay on the script thread
+    if procedural_subject:
+        sources.append(QuestionSource("procedural", 0, lambda count, deadline:
+                                      procedural.generate_questions(procedural_subject, difficulty, count)))
+    elif os.getenv("COHERE_API_KEY"):
+        latency, ai_executor = get_ai_latency_tracker(), get_ai_executor()
+        sources.append(QuestionSource("ai", 0, lambda count, deadline:
+                                      generate_ai_questions(topic, difficulty, deadline, count,
+                                                            latency, ai_executor, ai_cache, patience_at)))
     
-    # 🌍 GEOGRAPHY
-    elif any(word in topic_lower for word in ['geography', 'countries', 'continents', 'capitals', 'maps', 'world', 'earth']):
-        if difficulty == "easy":
-            questions = [
-                {
-                    "question": "Which is the largest continent?",
-                    "options": ["A) Africa", "B) North America", "C) Asia", "D) Europe"],
-                    "answer": "C",
-                    "hint": "This continent contains China, India, Russia, and many other countries",
-                    "xp": base_xp
-                },
-                {
-                    "question": "What is the capital of France?",
-                    "options": ["A) London", "B) Berlin", "C) Madrid", "D) Paris"],
-                    "answer": "D",
-                    "hint": "This city is famous for the Eiffel Tower",
-                    "xp": base_xp
-                }
-            ]
-        elif difficulty == "medium":
-            questions = [
-                {
-                    "question": "What is the capital of Australia?",
-                    "options": ["A) Sydney", "B) Melbourne", "C) Canberra", "D) Perth"],
-                    "answer": "C",
-                    "hint": "It's not the largest city, but the planned capital city",
-                    "xp": base_xp
-                },
-                {
-                    "question": "Which river is the longest in the world?",
-                    "options": ["A) Amazon", "B) Nile", "C) Mississippi", "D) Yangtze"],
-                    "answer": "B",
-                    "hint": "This river flows through Egypt and several African countries",
-                    "xp": base_xp
-                }
-            ]
-        else:  # hard
-            questions = [
-                {
-                    "question": "Which country has the most time zones?",
-                    "options": ["A) Russia", "B) USA", "C) France", "D) China"],
-                    "answer": "C",
-                    "hint": "Consider overseas territories and departments",
-                    "xp": base_xp
-                }
-            ]
+    cache_key = (topic.lower(), difficulty)
+    sources.append(QuestionSource("cached", 1, lambda count, deadline: ai_cache.sample(cache_key, count)))
     
-    # 📖 GENERAL STUDY SKILLS (fallback)
-    else:
-        questions = [
-            {
-                "question": f"What is the most effective way to study {topic}?",
-                "options": ["A) Cramming all at once", "B) Regular practice with breaks", "C) Reading without notes", "D) Memorizing everything"],
-                "answer": "B",
-                "hint": f"Spaced repetition and active learning work best for {topic}",
-                "xp": base_xp
-            },
-            {
-                "question": f"Why is {topic} important to learn?",
-                "options": ["A) Only for exams", "B) Real-world applications", "C) To impress others", "D) Not important"],
-                "answer": "B",
-                "hint": f"Most subjects like {topic} have practical uses in daily life",
-                "xp": base_xp
-            }
-        ]
+    snapshot = load_question_snapshot()
+    subject = snapshot.find_subject(topic) if snapshot else None
+    if subject:
+        sources.append(QuestionSource("bank", 1, lambda count, deadline:
+                                      snapshot.sample(subject, difficulty, count)))
     
-    return random.sample(questions, min(3, len(questions)))
+    def curated(count: int, deadline: float) -> List[Question]:
+        questions = get_curated_questions(topic, difficulty)
+        return random.sample(questions, min(count, len(questions)))
+    sources.append(QuestionSource("curated", 2, curated))
+    return sources
 
 # 🎯 MAIN QUEST GENERATION FUNCTION
-def generate_quest(topic: str, difficulty: str = "medium") -> List[Dict]:
+def generate_quest(topic: str, difficulty: str = "medium", count: int = QUEST_SIZE) -> QuestResult:
     """
     🚀 SMART QUEST GENERATION SYSTEM
-    1. First tries AI generation for personalized content
-    2. Falls back to subject-specific curated questions
-    3. Ensures all questions match the requested topic
+    1. Races AI, cached AI, generated, question bank and curated sources concurrently
+    2. Prefers the best-ranked source that answers within the patience window
+    3. Falls back to whatever is ready at the deadline, so curated questions are never late
+    Adaptive quests skip the pipeline and pick curated questions matching the user's skill.
     """
     
-    # Try AI generation first (if API key available)
-    ai_questions = generate_ai_questions(topic, difficulty)
+    if difficulty == "adaptive":
+        st.info(f"📈 Adaptive {topic} quest matched to your skill rating ({get_skill(topic):.0f})")
+        questions = generate_adaptive_quest(topic, count)
+        return QuestResult(questions, ["adaptive"] * len(questions))
+    
+    started = time.monotonic()
+    deadline = started + QUEST_DEADLINE_SECONDS
+    result = run_pipeline(build_question_sources(topic, difficulty, min(deadline, started + QUEST_PATIENCE_SECONDS)),
+                          count, get_pipeline_executor(), deadline=deadline, patience=QUEST_PATIENCE_SECONDS)
     
     # Always show what method we're using
-    if any('🤖 AI Generated' in str(st.session_state.get(key, '')) for key in st.session_state.keys()):
-        return ai_questions
+    counts = result.source_counts()
+    if "ai" in counts:
+        st.markdown('<div class="ai-status">🤖 AI Generated Questions!</div>', unsafe_allow_html=True)
+    elif set(counts) == {"procedural"}:
+        st.info(f"🧮 Fresh {topic} questions generated instantly!")
+    elif os.getenv("COHERE_API_KEY"):
+        st.info(f"📚 Using enhanced {topic} questions!")
     else:
         st.info(f"📚 Using enhanced {topic} questions! (Add COHERE_API_KEY for AI generation)")
-        return ai_questions  # This will be the curated ones from the fallback
+    return result
+
+# 🧹 QUEST-SCOPED SESSION STATE
+QUEST_PAGE_SIZES = [1, 5, 10]
+DEFAULT_QUEST_PAGE_SIZE = 5
+QUEST_STATE_PREFIX = "quest:"
+MAX_QUEST_NAMESPACES = 3
+MAX_QUEST_STATE_BYTES = 256 * 1024
+
+def quest_key(name: str) -> str:
+    """Session state key scoped to the active quest, e.g. quest:1a2b3c4d:answer_0"""
+    return f"{QUEST_STATE_PREFIX}{st.session_state.quest_id}:{name}"
+
+def evict_quest_state():
+    """
+    Drop widget state and results of quests that are no longer registered, and of the least
+    recently used ones once the session holds more than MAX_QUEST_NAMESPACES quests or
+    MAX_QUEST_STATE_BYTES of quest state
+    """
+    namespaces = st.session_state.setdefault('quest_namespaces', OrderedDict())
+    keys_by_namespace = defaultdict(list)
+    for key in list(st.session_state.keys()):
+        if isinstance(key, str) and key.startswith(QUEST_STATE_PREFIX):
+            keys_by_namespace[key[len(QUEST_STATE_PREFIX):].split(":", 1)[0]].append(key)
+    
+    def state_size(namespace: str) -> int:
+        size = 0
+        for key in keys_by_namespace.get(namespace, []):
+            try:
+                size += len(pickle.dumps(st.session_state[key]))
+            except Exception:
+                pass
+        return size
+    
+    # Keys whose quest is no longer registered are always dropped
+    doomed = [namespace for namespace in keys_by_namespace if namespace not in namespaces]
+    sizes = {namespace: state_size(namespace) for namespace in namespaces}
+    total = sum(sizes.values())
+    while len(namespaces) > 1 and (len(namespaces) > MAX_QUEST_NAMESPACES or total > MAX_QUEST_STATE_BYTES):
+        namespace, _ = namespaces.popitem(last=False)
+        total -= sizes[namespace]
+        doomed.append(namespace)
+    
+    for namespace in doomed:
+        for key in keys_by_namespace.get(namespace, []):
+            del st.session_state[key]
+
+def start_quest(quest_data: List[Question], topic: str, difficulty: str, sources: Optional[List[str]] = None,
+                state: Optional[Dict] = None):
+    """
+    Make quest_data the active quest in a fresh state namespace; the replaced quest's state is
+    evicted right away (its progress lives on in the quest history).
+    A saved `state` (from the quest history) restores its answers; otherwise the quest starts over
+    """
+    namespaces = st.session_state.setdefault('quest_namespaces', OrderedDict())
+    if 'quest_id' in st.session_state:
+        get_notes_prefetcher().cancel(notes_group(st.session_state.quest_id))
+        namespaces.pop(st.session_state.quest_id, None)
+    st.session_state.current_quest = quest_data
+    st.session_state.quest_sources = sources or []
+    st.session_state.quest_topic = topic
+    st.session_state.quest_difficulty = difficulty
+    st.session_state.quest_id = uuid.uuid4().hex[:8]
+    namespaces[st.session_state.quest_id] = True
+    evict_quest_state()
+    if state:
+        restore_quest_state(quest_data, state)
+    state = quest_state(quest_data)
+    with storage.open_db() as conn:
+        st.session_state.quest_hash = storage.save_quest(
+            conn, st.session_state.user_id, topic, difficulty, [question.to_dict() for question in quest_data],
+            st.session_state.quest_sources, state, RECENT_QUEST_LIMIT)
+    st.session_state[quest_key("saved")] = state
+    refresh_recent_quests()
+    prefetch_question_notes(st.session_state.quest_id, quest_data, topic)
+
+# 🗂️ QUEST HISTORY - retry or resume recent quests without generating them again
+RECENT_QUEST_LIMIT = 5
+
+def quest_state(quest: List[Question]) -> Dict:
+    """Compact answer state of the active quest: chosen option indexes (-1 = unanswered) and results"""
+    answers = st.session_state.get(quest_key("answers"), {})
+    results = st.session_state.get(quest_key("results"))
+    return {
+        "answers": [question.options.index(answers[i]) if answers.get(i) in question.options else -1
+                    for i, question in enumerate(quest)],
+        "correct": sorted(st.session_state.get(quest_key("correct"), ())),
+        "graded": sorted(st.session_state.get(quest_key("graded"), ())),
+        "awarded": sorted(st.session_state.get(quest_key("awarded"), ())),
+        "results": [int(result) for result in results] if results is not None else None,
+        "earned": st.session_state.get(quest_key("earned")),
+        "page": st.session_state.get(quest_key("page"), 0),
+    }
+
+def restore_quest_state(quest: List[Question], state: Dict):
+    st.session_state[quest_key("answers")] = {i: quest[i].options[option]
+                                              for i, option in enumerate(state["answers"][:len(quest)]) if option >= 0}
+    st.session_state[quest_key("correct")] = set(state["correct"])
+    st.session_state[quest_key("graded")] = set(state.get("graded", state["correct"]))
+    st.session_state[quest_key("awarded")] = set(state.get("awarded", state["correct"]))
+    if state.get("results") is not None:
+        st.session_state[quest_key("results")] = [bool(result) for result in state["results"]]
+    if state.get("earned") is not None:
+        st.session_state[quest_key("earned")] = state["earned"]
+    st.session_state[quest_key("page")] = state.get("page", 0)
+
+def refresh_recent_quests():
+    """Cached per session; reloaded only when a quest starts, so reruns don't touch the database"""
+    with storage.open_db() as conn:
+        st.session_state.recent_quests = storage.recent_quests(conn, st.session_state.user_id, RECENT_QUEST_LIMIT)
+
+def save_quest_progress(quest: List[Question]):
+    """Persist the active quest's answers whenever they change, so a reload can resume it"""
+    state = quest_state(quest)
+    if state != st.session_state.get(quest_key("saved")):
+        with storage.open_db() as conn:
+            storage.save_quest_state(conn, st.session_state.user_id, st.session_state.quest_hash, state)
+        st.session_state[quest_key("saved")] = state
+        for entry in st.session_state.get('recent_quests', []):
+            if entry["hash"] == st.session_state.quest_hash:
+                entry["state"] = state
+
+def open_saved_quest(digest: str, resume: bool = True) -> bool:
+    """Resume a stored quest where it was left, or retry it from scratch - a lookup, never a new generation"""
+    with storage.open_db() as conn:
+        saved = storage.load_quest(conn, st.session_state.user_id, digest)
+    if saved is None:
+        return False
+    questions = [Question.from_dict(question) for question in saved["questions"]]
+    state = saved["state"]
+    if state and not resume:
+        # A retry starts the answers over, but XP and rating changes already earned aren't paid again
+        state = {"answers": [-1] * len(questions), "correct": [], "results": None, "page": 0,
+                 "graded": state.get("graded", state["correct"]), "awarded": state.get("awarded", state["correct"])}
+    start_quest(questions, saved["topic"], saved["difficulty"], saved["sources"], state)
+    return True
+
+def start_review_quest(subject: str, texts: List[str]) -> int:
+    """
+    🔁 Start a quest of the review items the recommender found due, looked up in the user's
+    stored quests, the imported bank or the catalog; returns how many of them could be found
+    """
+    with storage.open_db() as conn:
+        stored = storage.find_questions(conn, st.session_state.user_id, texts)
+    curated = {question.question: question for content in catalog.subjects
+               for group in content.questions.values() for question in group}
+    questions = [Question.from_dict(stored[text]) if text in stored else curated[text]
+                 for text in dict.fromkeys(texts) if text in stored or text in curated]
+    if questions:
+        start_quest(questions, subject, "review", ["review"] * len(questions))
+    return len(questions)
+
+def submit_quest(quest: List[Question], selections: List[Optional[str]], topic: str,
+                 already_correct: Collection[int] = (), already_awarded: Collection[int] = (),
+                 graded: Optional[set] = None) -> Tuple[List[bool], int]:
+    """
+    📝 SUBMIT WHOLE QUEST
+    Grades every answer together and applies one aggregated progress update,
+    so badges, storage writes and event logging run once per quest instead of per question.
+    Questions already answered correctly one at a time in this attempt aren't graded again,
+    questions whose XP was paid on any attempt earn nothing again, and only questions
+    missing from `graded` move the skill rating (they are added to it).
+    Returns (results, XP gained)
+    """
+    results = [question.is_correct(selected) for question, selected in zip(quest, selections)]
+    fresh = [i for i in range(len(quest)) if i not in already_correct]
+    earning = [i for i in fresh if results[i] and i not in already_awarded]
+    graded = graded if graded is not None else set()
+    for i in range(len(quest)):
+        if i not in graded:
+            graded.add(i)
+            update_skill(topic, quest[i].rating, results[i])
+    
+    xp_gained = sum(quest[i].xp for i in earning)
+    if xp_gained:
+        apply_progress({topic: xp_gained})
+    else:
+        save_user_data(st.session_state.user_data)
+    log_events([("answer", topic, quest[i].question, results[i], quest[i].xp if i in earning else 0) for i in fresh])
+    return results, xp_gained
 
 # 💫 MOTIVATIONAL SYSTEM
+QUOTABLE_API_URL = os.getenv("QUOTABLE_API_URL", "https://api.quotable.io")
+
 def get_motivational_content():
     """Get motivational quotes from free APIs or curated content"""
     try:
-        response = requests.get("https://api.quotable.io/random?tags=motivational", timeout=5)
+        response = requests.get(f"{QUOTABLE_API_URL}/random?tags=motivational", timeout=5)
         if response.status_code == 200:
             data = response.json()
             return f"💭 \"{data['content']}\" - {data['author']}"
     except:
         pass
     
-    quotes = [
-        "🌟 \"The expert in anything was once a beginner.\" - Helen Hayes",
-        "🚀 \"Success is the sum of small efforts repeated daily.\" - Robert Collier",
-        "💪 \"It always seems impossible until it's done.\" - Nelson Mandela",
-        "🎯 \"Education is the most powerful weapon for change.\" - Nelson Mandela"
-    ]
-    return random.choice(quotes)
+    return random.choice(catalog.quotes)
 
 def get_study_tip():
     """Generate subject-specific study tips"""
-    tips = [
-        "🧠 Use the Feynman Technique: Explain concepts simply to test understanding",
-        "📝 Handwritten notes improve retention by 40% compared to typing",
-        "⏰ Study in 25-minute focused blocks (Pomodoro Technique)",
-        "🔄 Use spaced repetition - review material at increasing intervals",
-        "🎵 Instrumental music can enhance focus and concentration",
-        "💧 Stay hydrated - dehydration affects cognitive performance",
-        "📱 Remove distractions - put devices in another room while studying"
-    ]
-    return random.choice(tips)
+    return random.choice(catalog.tips)
 
 # 🏆 PROGRESS TRACKING SYSTEM
 def update_progress(xp_gained: int, subject: str):
-    today = datetime.now().date()
-    last_activity = st.session_state.user_data.get('last_activity')
-    
-    # Update streak logic
-    if last_activity:
-        if isinstance(last_activity, str):
-            last_date = datetime.fromisoformat(last_activity).date()
-        else:
-            last_date = last_activity
-            
-        if today == last_date:
-            pass  # Same day, maintain streak
-        elif today == last_date + timedelta(days=1):
-            st.session_state.user_data['streak'] += 1
-        else:
-            st.session_state.user_data['streak'] = 1
-    else:
-        st.session_state.user_data['streak'] = 1
-    
-    # Update XP and tracking
-    st.session_state.user_data['xp'] += xp_gained
-    st.session_state.user_data['total_xp'] += xp_gained
-    st.session_state.user_data['daily_xp'] += xp_gained
-    st.session_state.user_data['last_activity'] = today.isoformat()
-    
-    # Track subjects
-    if subject not in st.session_state.user_data['subjects_studied']:
-        st.session_state.user_data['subjects_studied'][subject] = 0
-    st.session_state.user_data['subjects_studied'][subject] += xp_gained
-    
+    apply_progress({subject: xp_gained})
+
+def apply_progress(xp_by_subject: Dict[str, int]):
+    """Apply one aggregated XP delta: streak, totals and per-subject XP, then badges and save once"""
+    st.session_state.user_data.add_xp(xp_by_subject, local_today(st.session_state.user_data.timezone))
     check_badges()
     save_user_data(st.session_state.user_data)
 
+BADGE_MESSAGES = {
+    "xp": "New Badge Unlocked",
+    "streak": "Streak Badge Unlocked",
+    "subjects": "Diversity Badge Unlocked"
+}
+
 def check_badges():
-    """Smart badge system with meaningful achievements"""
-    badges = st.session_state.user_data['badges']
-    total_xp = st.session_state.user_data['total_xp']
-    streak = st.session_state.user_data['streak']
-    subjects_count = len(st.session_state.user_data['subjects_studied'])
-    
-    # XP-based badges
-    xp_badges = [
-        (100, "🌟 First Steps", "Earned your first 100 XP!"),
-        (500, "🎯 Focused Learner", "Reached 500 XP milestone!"),
-        (1000, "🏆 Study Champion", "Achieved 1000 XP!"),
-        (2500, "🎓 Academic Master", "Reached 2500 XP!"),
-        (5000, "🦸 Learning Hero", "Epic 5000 XP achievement!")
-    ]
-    
-    # Streak badges
-    streak_badges = [
-        (3, "🔥 Hot Streak", "3 days in a row!"),
-        (7, "⚡ Weekly Warrior", "7 day streak!"),
-        (14, "🚀 Study Rocket", "2 weeks strong!"),
-        (30, "💎 Diamond Dedication", "30 day streak!")
-    ]
-    
-    # Subject diversity badges
-    subject_badges = [
-        (3, "🌈 Multi-Learner", "Studied 3 different subjects!"),
-        (5, "🎨 Renaissance Scholar", "Mastered 5 subjects!"),
-        (10, "🧠 Universal Mind", "Explored 10+ subjects!")
-    ]
-    
-    # Check all badge types
-    for threshold, title, desc in xp_badges:
-        if total_xp >= threshold and title not in badges:
-            badges.append(title)
-            st.success(f"🎉 New Badge Unlocked: {title} - {desc}")
-    
-    for threshold, title, desc in streak_badges:
-        if streak >= threshold and title not in badges:
-            badges.append(title)
-            st.success(f"🎉 Streak Badge Unlocked: {title} - {desc}")
-    
-    for threshold, title, desc in subject_badges:
-        if subjects_count >= threshold and title not in badges:
-            badges.append(title)
-            st.success(f"🎉 Diversity Badge Unlocked: {title} - {desc}")
+    """Smart badge system with meaningful achievements (tiers live in the content catalog)"""
+    for kind, title, desc in st.session_state.user_data.unlock_badges(catalog.badges):
+        st.success(f"🎉 {BADGE_MESSAGES[kind]}: {title} - {desc}")
+
+# 🌙 DAILY ROLLOVER
+@st.cache_resource
+def get_rollover_job() -> Optional[threading.Event]:
+    """
+    One background rollover loop per process: resets daily XP and breaks lapsed streaks at
+    each user's local midnight, so stored streaks are current even for users who didn't play
+    """
+    if os.getenv("STUDYQUEST_ROLLOVER", "1") == "0":
+        return None
+    watcher = get_catalog_watcher()  # resolved here; the lambda runs on the rollover thread
+    return rollover.start_rollover_thread(lambda: watcher.current().badges)
+
+get_rollover_job()
+
+# ⏱️ FOCUS SESSIONS
+@st.cache_resource
+def get_focus_scheduler() -> FocusScheduler:
+    """One scheduler per process; it awards focus XP at the deadline even without a browser"""
+    return FocusScheduler()
+
+def collect_focus_awards() -> bool:
+    """
+    Merge focus-session XP the scheduler queued in the background into this session's progress.
+    The queue is drained on the first rerun of a session too, for sessions finished while the tab was closed
+    """
+    completed = get_focus_scheduler().pop_completed(st.session_state.user_id)
+    if not completed and 'focus_awards_checked' in st.session_state:
+        return False
+    st.session_state.focus_awards_checked = True
+    with storage.open_db() as conn:
+        awards = storage.take_awards(conn, st.session_state.user_id)
+    if not awards:
+        return False
+    user_data = st.session_state.user_data
+    for subject, xp, day in awards:
+        earned = date.fromisoformat(day)
+        if user_data.last_activity:  # never move the streak backwards for an award merged late
+            earned = max(earned, date.fromisoformat(user_data.last_activity))
+        user_data.add_xp({subject: xp}, earned)
+    check_badges()
+    save_user_data(user_data)
+    return True
 
 # 🎲 RANDOM EDUCATIONAL CONTENT
+NUMBERS_API_URL = os.getenv("NUMBERS_API_URL", "http://numbersapi.com")
+
 def get_random_educational_fact():
     """Get educational facts from free APIs with fallbacks"""
     try:
         # Numbers API - completely free
-        response = requests.get("http://numbersapi.com/random/trivia", timeout=5)
+        response = requests.get(f"{NUMBERS_API_URL}/random/trivia", timeout=5)
         if response.status_code == 200:
             return f"🔢 {response.text}"
     except:
         pass
     
-    # Curated educational facts
-    facts = [
-        "🧠 Your brain has about 86 billion neurons, more than stars in the Milky Way!",
-        "📚 Reading for 6 minutes can reduce stress by up to 68%!",
-        "⚡ Nerve impulses travel at speeds up to 268 mph!",
-        "🌍 Earth is approximately 4.54 billion years old!",
-        "🎨 Learning new skills creates new neural pathways at any age!",
-        "🌙 During sleep, your brain consolidates memories from the day!",
-        "🎵 Music activates more areas of the brain than any other activity!",
-        "🏃 Exercise increases BDNF, which helps grow new brain cells!"
-    ]
-    return random.choice(facts)
+    return random.choice(catalog.facts)
 
 # ========================
 # 🖥️ MAIN APPLICATION UI
 # ========================
 
+collect_focus_awards()
+
+# After a reload or worker restart, pick up the user's latest quest where they left it
+if 'recent_quests' not in st.session_state:
+    refresh_recent_quests()
+    if 'current_quest' not in st.session_state and st.session_state.recent_quests:
+        open_saved_quest(st.session_state.recent_quests[0]["hash"])
+
 # Header
 st.markdown('<div class="main-header"><h1>🎮 StudyQuest</h1><p>AI-Powered Learning Adventure Platform</p></div>', 
             unsafe_allow_html=True)
@@ -762,24 +920,24 @@ with st.sidebar:
     st.header("🏆 Your Progress")
     
     # XP Display
-    st.markdown(f'<div class="xp-badge">⭐ {st.session_state.user_data["xp"]} XP</div>', 
+    st.markdown(f'<div class="xp-badge">⭐ {st.session_state.user_data.xp} XP</div>', 
                 unsafe_allow_html=True)
     
     # Streak counter
     st.markdown(f'''<div class="streak-counter">
-        🔥 {st.session_state.user_data["streak"]} Day Streak!
+        🔥 {st.session_state.user_data.streak} Day Streak!
     </div>''', unsafe_allow_html=True)
     
     # Level calculation
-    level = st.session_state.user_data['total_xp'] // 100 + 1
-    xp_for_next = 100 - (st.session_state.user_data['total_xp'] % 100)
-    st.progress((st.session_state.user_data['total_xp'] % 100) / 100)
+    level = st.session_state.user_data.total_xp // 100 + 1
+    xp_for_next = 100 - (st.session_state.user_data.total_xp % 100)
+    st.progress((st.session_state.user_data.total_xp % 100) / 100)
     st.write(f"📊 Level {level} • {xp_for_next} XP to next level")
     
     # Badges display
-    if st.session_state.user_data['badges']:
+    if st.session_state.user_data.badges:
         st.subheader("🏅 Your Badges")
-        for badge in st.session_state.user_data['badges']:
+        for badge in st.session_state.user_data.badges:
             st.markdown(f'<div class="badge">{badge}</div>', unsafe_allow_html=True)
 
 # Main app tabs
@@ -793,6 +951,30 @@ with tab1:
     with col1:
         st.subheader("📚 Create Your Quest")
         
+        # Personal recommendations
+        recommendations = st.session_state.recommendations
+        due_items = defaultdict(list)  # subject -> overdue question texts, most overdue first
+        for item in recommendations.get("due", []):
+            due_items[item["subject"]].append(item["question"])
+        recommended = [("🎯 Needs practice", f"{item['subject']} ({item['accuracy']:.0%})", item["subject"])
+                       for item in recommendations.get("weak", [])]
+        recommended += [("🔁 Due for review", f"{subject} · {len(texts)}", subject) for subject, texts in due_items.items()]
+        recommended += [("📈 Trending", subject, subject) for subject in recommendations.get("trending", [])]
+        if recommended:
+            st.write("**🧭 Recommended for you:**")
+            for heading in dict.fromkeys(kind for kind, _, _ in recommended):
+                row = [(label, subject) for kind, label, subject in recommended if kind == heading]
+                st.caption(heading)
+                for i, (column, (label, subject)) in enumerate(zip(st.columns(4), row[:4])):
+                    with column:
+                        if st.button(label, key=f"rec_{heading}_{i}"):
+                            if heading == "🔁 Due for review" and start_review_quest(subject, due_items[subject]):
+                                st.success(f"✅ {subject} review ready! Go to Quests tab to begin!")
+                            else:
+                                if heading == "🔁 Due for review":
+                                    st.info(f"Those {subject} questions aren't stored any more - try a fresh quest")
+                                st.session_state.selected_topic = subject
+
         # Popular subject suggestions
         st.write("**🔥 Popular Subjects:**")
         subject_cols = st.columns(4)
@@ -816,7 +998,9 @@ with tab1:
                             placeholder="e.g., Python Programming, Algebra, Biology, World War II...")
         
         difficulty = st.selectbox("Choose difficulty:", 
-                                ["easy", "medium", "hard"])
+                                ["easy", "medium", "hard", "adaptive"])
+        
+        quest_length = st.number_input("How many questions?", min_value=3, max_value=MAX_QUEST_LENGTH, value=QUEST_SIZE)
         
         study_time = st.slider("How long will you study? (minutes)", 
                              5, 120, 25)
@@ -824,11 +1008,9 @@ with tab1:
         if st.button("🚀 Generate Quest", type="primary"):
             if topic:
                 with st.spinner(f"🎲 Creating {difficulty} {topic} quest..."):
-                    quest_data = generate_quest(topic, difficulty)
-                    if quest_data:
-                        st.session_state.current_quest = quest_data
-                        st.session_state.quest_topic = topic
-                        st.session_state.quest_difficulty = difficulty
+                    quest_result = generate_quest(topic, difficulty, int(quest_length))
+                    if quest_result.questions:
+                        start_quest(quest_result.questions, topic, difficulty, quest_result.sources)
                         st.success(f"✅ {topic} quest ready! Go to Quests tab to begin!")
                         st.balloons()
                     else:
@@ -841,8 +1023,8 @@ with tab1:
         motivation = get_motivational_content()
         st.info(motivation)
         
-        if st.session_state.user_data['daily_xp'] > 0:
-            st.metric("Today's XP", st.session_state.user_data['daily_xp'])
+        if st.session_state.user_data.daily_xp > 0:
+            st.metric("Today's XP", st.session_state.user_data.daily_xp)
         
         # Study tip
         st.subheader("💡 Pro Study Tip")
@@ -857,88 +1039,203 @@ with tab2:
         quest = st.session_state.current_quest
         topic = st.session_state.get('quest_topic', 'Unknown')
         difficulty = st.session_state.get('quest_difficulty', 'medium')
+        if 'quest_id' not in st.session_state:
+            start_quest(quest, topic, difficulty)
+        st.session_state.quest_namespaces.move_to_end(st.session_state.quest_id)
         
         # Quest header
         st.markdown(f"""
         ### 📖 {topic} Challenge ({difficulty.title()} Level)
         **🎯 Complete all questions to earn XP and advance your learning!**
         """)
+        quest_sources = st.session_state.get('quest_sources', [])
+        if quest_sources:
+            served_by = QuestResult(quest, quest_sources).source_counts()
+            st.caption("Served by: " + " · ".join(f"{SOURCE_LABELS.get(name, name)} ×{count}"
+                                                  for name, count in served_by.items()))
         
-        # Question counter
+        # Question counter - driven by answered state, never by how many cards are rendered
         total_questions = len(quest)
-        st.progress(0, text=f"Question Progress: 0/{total_questions}")
+        answers = st.session_state.setdefault(quest_key("answers"), {})   # question index -> chosen option
+        correct = st.session_state.setdefault(quest_key("correct"), set())
+        graded = st.session_state.setdefault(quest_key("graded"), set())    # questions whose rating was updated
+        awarded = st.session_state.setdefault(quest_key("awarded"), set())  # questions whose XP was paid, kept on retry
+        progress_slot = st.empty()  # filled in after this rerun's answers are recorded
         
-        for i, question_data in enumerate(quest):
-            st.markdown(f'<div class="quest-card">', unsafe_allow_html=True)
-            st.write(f"**❓ Question {i+1} of {total_questions}:**")
-            st.write(f"### {question_data['question']}")
-            
-            # Create unique key for each question
-            answer_key = f"answer_{topic}_{i}_{difficulty}"
-            
-            selected = st.radio(
-                "Choose your answer:",
-                question_data['options'],
-                key=answer_key,
-                index=None
-            )
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                if st.button(f"💡 Get Hint", key=f"hint_{i}"):
-                    st.info(f"💭 **Hint:** {question_data['hint']}")
+        mode_col, page_col = st.columns([3, 1])
+        with mode_col:
+            grading_mode = st.radio("Grading mode:", ["✅ One question at a time", "📝 Submit whole quest"],
+                                    horizontal=True, key="grading_mode")
+        with page_col:
+            page_size = st.selectbox("Questions per page:", QUEST_PAGE_SIZES,
+                                     index=QUEST_PAGE_SIZES.index(DEFAULT_QUEST_PAGE_SIZE), key="quest_page_size")
+        
+        # Only the current page's questions get widgets, so a rerun costs the same for 3 or 50 questions
+        page_count = -(-total_questions // page_size)
+        page = min(st.session_state.get(quest_key("page"), 0), page_count - 1)
+        visible = range(page * page_size, min(total_questions, (page + 1) * page_size))
+        
+        if grading_mode == "📝 Submit whole quest":
+            results = st.session_state.get(quest_key("results"))
+            # A form batches every radio change into a single rerun on submit
+            with st.form(quest_key("form")):
+                selections = {}
+                for i in visible:
+                    question_data = quest[i]
+                    st.write(f"**❓ Question {i+1} of {total_questions}:**")
+                    st.write(f"### {question_data.question}")
+                    saved = answers.get(i)
+                    selections[i] = st.radio(
+                        "Choose your answer:",
+                        question_data.options,
+                        key=quest_key(f"answer_{i}"),
+                        index=question_data.options.index(saved) if saved in question_data.options else None,
+                        disabled=results is not None
+                    )
+                    notes = get_question_notes(question_data, topic)
+                    with st.expander("💡 Hint"):
+                        st.write(notes.hint)
+                    if results is not None:
+                        if results[i]:
+                            st.success("🎉 Correct!")
+                        else:
+                            st.error(f"❌ Correct answer: {question_data.correct_option}")
+                            st.info(f"💡 **Why:** {notes.explanation}")
+                    st.markdown("---")
+                
+                nav_cols = st.columns(3)
+                with nav_cols[0]:
+                    previous_page = st.form_submit_button("⬅️ Previous", disabled=page == 0)
+                with nav_cols[1]:
+                    next_page = st.form_submit_button("Next ➡️", disabled=page >= page_count - 1)
+                with nav_cols[2]:
+                    submitted = st.form_submit_button("📝 Submit Quest", type="primary", disabled=results is not None)
             
-            with col2:
-                if st.button(f"✅ Submit Answer", key=f"submit_{i}", type="primary"):
-                    if selected:
-                        correct_answer = question_data['answer']
-                        if selected.startswith(correct_answer):
-                            st.success("🎉 Correct! Excellent work!")
-                            xp_gained = question_data.get('xp', 50)
-                            update_progress(xp_gained, topic)
-                            
-                            # Subject-specific encouragement
-                            if 'computer' in topic.lower() or 'programming' in topic.lower():
-                                encouragements = [
-                                    "💻 Great coding logic! You're thinking like a programmer!",
-                                    "🚀 Excellent! Your programming skills are improving!",
-                                    "⚡ Perfect! You understand this computer science concept!"
-                                ]
-                            elif 'math' in topic.lower():
-                                encouragements = [
-                                    "🧮 Mathematical genius! Your calculation skills are sharp!",
-                                    "📐 Perfect! You've mastered this mathematical concept!",
-                                    "🎯 Excellent problem-solving! Math is your strength!"
-                                ]
-                            elif 'science' in topic.lower():
-                                encouragements = [
-                                    "🔬 Scientific thinking at its best! Well done!",
-                                    "🧪 Brilliant! You understand this scientific principle!",
-                                    "🌟 Excellent! Your science knowledge is expanding!"
-                                ]
+            if results is None and (previous_page or next_page or submitted):
+                answers.update({i: selected for i, selected in selections.items() if selected is not None})
+            if previous_page or next_page:
+                st.session_state[quest_key("page")] = page + (1 if next_page else -1)
+                st.rerun()
+            if submitted:
+                if len(answers) < total_questions:
+                    missing = [i + 1 for i in range(total_questions) if i not in answers]
+                    st.warning(f"Please answer every question before submitting the quest! Missing: {', '.join(map(str, missing[:10]))}")
+                else:
+                    results, earned = submit_quest(quest, [answers[i] for i in range(total_questions)], topic,
+                                                   correct, awarded, graded)
+                    st.session_state[quest_key("results")] = results
+                    st.session_state[quest_key("earned")] = earned
+                    correct.update(i for i, is_correct in enumerate(results) if is_correct)
+                    awarded.update(correct)
+                    st.rerun()
+            elif results is not None:
+                correct_count = sum(results)
+                earned = st.session_state.get(quest_key("earned"), sum(q.xp for q, is_correct in zip(quest, results) if is_correct))
+                st.success(f"🏁 Quest complete: {correct_count}/{total_questions} correct, +{earned} XP!")
+        else:
+            for i in visible:
+                question_data = quest[i]
+                st.markdown(f'<div class="quest-card">', unsafe_allow_html=True)
+                st.write(f"**❓ Question {i+1} of {total_questions}:**")
+                st.write(f"### {question_data.question}")
+                
+                # Create unique key for each question
+                answer_key = quest_key(f"answer_{i}")
+                saved = answers.get(i)
+                
+                selected = st.radio(
+                    "Choose your answer:",
+                    question_data.options,
+                    key=answer_key,
+                    index=question_data.options.index(saved) if saved in question_data.options else None
+                )
+                
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    if st.button(f"💡 Get Hint", key=quest_key(f"hint_{i}")):
+                        st.info(f"💭 **Hint:** {get_question_notes(question_data, topic).hint}")
+                
+                with col2:
+                    if st.button(f"✅ Submit Answer", key=quest_key(f"submit_{i}"), type="primary"):
+                        if i in correct:
+                            st.info("✅ Already answered correctly - on to the next one!")
+                        elif selected:
+                            answers[i] = selected
+                            is_correct = question_data.is_correct(selected)
+                            if i not in graded:  # the rating moves once per question, not per click
+                                graded.add(i)
+                                update_skill(topic, question_data.rating, is_correct)
+                            log_event("answer", topic, question_data.question, is_correct,
+                                      question_data.xp if is_correct and i not in awarded else 0)
+                            if is_correct:
+                                correct.add(i)
+                                st.success("🎉 Correct! Excellent work!")
+                                if i in awarded:
+                                    st.caption("XP for this question was already earned on an earlier try")
+                                    save_user_data(st.session_state.user_data)
+                                else:
+                                    awarded.add(i)
+                                    update_progress(question_data.xp, topic)
+                                
+                                # Subject-specific encouragement
+                                if 'computer' in topic.lower() or 'programming' in topic.lower():
+                                    encouragements = [
+                                        "💻 Great coding logic! You're thinking like a programmer!",
+                                        "🚀 Excellent! Your programming skills are improving!",
+                                        "⚡ Perfect! You understand this computer science concept!"
+                                    ]
+                                elif 'math' in topic.lower():
+                                    encouragements = [
+                                        "🧮 Mathematical genius! Your calculation skills are sharp!",
+                                        "📐 Perfect! You've mastered this mathematical concept!",
+                                        "🎯 Excellent problem-solving! Math is your strength!"
+                                    ]
+                                elif 'science' in topic.lower():
+                                    encouragements = [
+                                        "🔬 Scientific thinking at its best! Well done!",
+                                        "🧪 Brilliant! You understand this scientific principle!",
+                                        "🌟 Excellent! Your science knowledge is expanding!"
+                                    ]
+                                else:
+                                    encouragements = [
+                                        f"📚 Outstanding work in {topic}! Keep it up!",
+                                        f"🌟 You're mastering {topic} concepts brilliantly!",
+                                        f"🏆 Perfect! {topic} is becoming your strength!"
+                                    ]
+                                
+                                st.info(f"🤖 AI Coach: {random.choice(encouragements)}")
                             else:
-                                encouragements = [
-                                    f"📚 Outstanding work in {topic}! Keep it up!",
-                                    f"🌟 You're mastering {topic} concepts brilliantly!",
-                                    f"🏆 Perfect! {topic} is becoming your strength!"
-                                ]
-                            
-                            st.info(f"🤖 AI Coach: {random.choice(encouragements)}")
+                                st.error("❌ Not quite right. Try again!")
+                                save_user_data(st.session_state.user_data)
+                                # Show detailed explanation
+                                st.info(f"📚 **Correct Answer:** {question_data.correct_option}")
+                                st.info(f"💡 **Why:** {get_question_notes(question_data, topic).explanation}")
                         else:
-                            st.error("❌ Not quite right. Try again!")
-                            # Show detailed explanation
-                            correct_option = [opt for opt in question_data['options'] if opt.startswith(correct_answer)][0]
-                            st.info(f"📚 **Correct Answer:** {correct_option}")
-                            st.info(f"💡 **Why:** {question_data['hint']}")
-                    else:
-                        st.warning("Please select an answer first!")
-            
-            with col3:
-                if st.button(f"⏭️ Skip Question", key=f"skip_{i}"):
-                    st.info("Question skipped. Try another one!")
+                            st.warning("Please select an answer first!")
+                
+                with col3:
+                    if st.button(f"⏭️ Skip Question", key=quest_key(f"skip_{i}")):
+                        st.info("Question skipped. Try another one!")
+                
+                st.markdown('</div>', unsafe_allow_html=True)
+                st.markdown("---")
             
-            st.markdown('</div>', unsafe_allow_html=True)
-            st.markdown("---")
+            if page_count > 1:
+                nav_cols = st.columns(3)
+                with nav_cols[0]:
+                    if st.button("⬅️ Previous", key=quest_key("previous"), disabled=page == 0):
+                        st.session_state[quest_key("page")] = page - 1
+                        st.rerun()
+                with nav_cols[1]:
+                    st.caption(f"Page {page + 1} of {page_count}")
+                with nav_cols[2]:
+                    if st.button("Next ➡️", key=quest_key("next"), disabled=page >= page_count - 1):
+                        st.session_state[quest_key("page")] = page + 1
+                        st.rerun()
+        
+        progress_slot.progress(len(answers) / total_questions,
+                               text=f"Question Progress: {len(answers)}/{total_questions} answered · {len(correct)} correct")
+        save_quest_progress(quest)
     else:
         st.info("🎯 No active quest! Go to the Home tab to generate one.")
         
@@ -948,19 +1245,35 @@ with tab2:
         
         with quick_cols[0]:
             if st.button("💻 Computer Science Quiz"):
-                quest_data = generate_quest("Computer Science", "medium")
-                st.session_state.current_quest = quest_data
-                st.session_state.quest_topic = "Computer Science"
-                st.session_state.quest_difficulty = "medium"
+                quest_result = generate_quest("Computer Science", "medium")
+                start_quest(quest_result.questions, "Computer Science", "medium", quest_result.sources)
                 st.rerun()
         
         with quick_cols[1]:
             if st.button("🧮 Math Challenge"):
-                quest_data = generate_quest("Mathematics", "medium")
-                st.session_state.current_quest = quest_data
-                st.session_state.quest_topic = "Mathematics"
-                st.session_state.quest_difficulty = "medium"
+                quest_result = generate_quest("Mathematics", "medium")
+                start_quest(quest_result.questions, "Mathematics", "medium", quest_result.sources)
                 st.rerun()
+    
+    # Recent quests - stored per user, so retrying one is a lookup instead of another AI call
+    recent = st.session_state.recent_quests
+    if recent:
+        with st.expander("🕘 Recent Quests", expanded=not st.session_state.get('current_quest')):
+            for entry in recent:
+                answered = sum(option >= 0 for option in entry["state"]["answers"])
+                is_active = entry["hash"] == st.session_state.get('quest_hash')
+                info_col, resume_col, retry_col = st.columns([3, 1, 1])
+                with info_col:
+                    st.write(f"**{entry['topic']}** ({entry['difficulty'].title()}) · "
+                             f"{answered}/{len(entry['state']['answers'])} answered" + (" · ▶️ active" if is_active else ""))
+                with resume_col:
+                    if st.button("▶️ Resume", key=f"resume_{entry['hash']}", disabled=is_active):
+                        open_saved_quest(entry["hash"])
+                        st.rerun()
+                with retry_col:
+                    if st.button("🔁 Retry", key=f"retry_{entry['hash']}"):
+                        open_saved_quest(entry["hash"], resume=False)
+                        st.rerun()
 
 with tab3:
     st.header("📊 Your Learning Dashboard")
@@ -969,24 +1282,24 @@ with tab3:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total XP", st.session_state.user_data['total_xp'])
+        st.metric("Total XP", st.session_state.user_data.total_xp)
     
     with col2:
-        st.metric("Current Streak", f"{st.session_state.user_data['streak']} days")
+        st.metric("Current Streak", f"{st.session_state.user_data.streak} days")
     
     with col3:
-        level = st.session_state.user_data['total_xp'] // 100 + 1
+        level = st.session_state.user_data.total_xp // 100 + 1
         st.metric("Current Level", level)
     
     with col4:
-        subjects_count = len(st.session_state.user_data['subjects_studied'])
+        subjects_count = len(st.session_state.user_data.subjects_studied)
         st.metric("Subjects Studied", subjects_count)
     
     # Detailed progress
-    if st.session_state.user_data['subjects_studied']:
+    if st.session_state.user_data.subjects_studied:
         st.subheader("📚 Subject Mastery Progress")
         
-        for subject, xp in st.session_state.user_data['subjects_studied'].items():
+        for subject, xp in st.session_state.user_data.subjects_studied.items():
             col_a, col_b = st.columns([3, 1])
             with col_a:
                 progress = min(xp / 500, 1.0)
@@ -997,9 +1310,9 @@ with tab3:
     
     # Achievement showcase
     st.subheader("🏅 Achievement Gallery")
-    if st.session_state.user_data['badges']:
+    if st.session_state.user_data.badges:
         badge_cols = st.columns(3)
-        for i, badge in enumerate(st.session_state.user_data['badges']):
+        for i, badge in enumerate(st.session_state.user_data.badges):
             with badge_cols[i % 3]:
                 st.markdown(f'<div class="badge">{badge}</div>', unsafe_allow_html=True)
     else:
@@ -1011,6 +1324,41 @@ with tab3:
         fact = get_random_educational_fact()
         st.info(fact)
 
+# ⏱️ FOCUS TIMER
+def render_focus_timer():
+    """Countdown display; runs as a fragment that refreshes itself once a second while the timer is active"""
+    if st.session_state.timer_active and st.session_state.timer_start:
+        elapsed = time.time() - st.session_state.timer_start
+
+        if st.session_state.break_time:
+            remaining = max(0, BREAK_DURATION - elapsed)
+            if remaining <= 0:
+                st.session_state.timer_active = False
+                st.session_state.break_time = False
+                st.session_state.focus_notice = "✅ Break time over! Ready for another focus session?"
+                st.rerun()  # the whole page, so the timer controls and sidebar catch up
+            else:
+                mins, secs = divmod(int(remaining), 60)
+                st.markdown(f'<div class="focus-timer">🧘 Break Time<br>{mins:02d}:{secs:02d}</div>', 
+                           unsafe_allow_html=True)
+        else:
+            remaining = max(0, FOCUS_DURATION - elapsed)
+            if remaining <= 0:
+                # The scheduler queues the XP; finish it now if we got here first
+                get_focus_scheduler().finish_if_due(st.session_state.user_id)
+                collect_focus_awards()
+                st.session_state.break_time = True
+                st.session_state.timer_start += FOCUS_DURATION
+                st.session_state.focus_notice = "🎉 Focus session complete! Great concentration!"
+                st.rerun()
+            else:
+                mins, secs = divmod(int(remaining), 60)
+                st.markdown(f'<div class="focus-timer">🎯 Focus Time<br>{mins:02d}:{secs:02d}</div>', 
+                           unsafe_allow_html=True)
+    else:
+        st.markdown('<div class="focus-timer">⏱️ Ready to Focus?<br>25:00</div>', 
+                   unsafe_allow_html=True)
+
 with tab4:
     st.header("⏱️ Focus Mode - Pomodoro Timer")
     
@@ -1023,37 +1371,13 @@ with tab4:
             st.session_state.timer_active = False
             st.session_state.break_time = False
         
-        if st.session_state.timer_active and st.session_state.timer_start:
-            elapsed = time.time() - st.session_state.timer_start
-            focus_duration = 25 * 60  # 25 minutes
-            break_duration = 5 * 60   # 5 minutes
-            
-            if st.session_state.break_time:
-                remaining = max(0, break_duration - elapsed)
-                if remaining <= 0:
-                    st.session_state.timer_active = False
-                    st.session_state.break_time = False
-                    st.balloons()
-                    st.success("✅ Break time over! Ready for another focus session?")
-                else:
-                    mins, secs = divmod(int(remaining), 60)
-                    st.markdown(f'<div class="focus-timer">🧘 Break Time<br>{mins:02d}:{secs:02d}</div>', 
-                               unsafe_allow_html=True)
-            else:
-                remaining = max(0, focus_duration - elapsed)
-                if remaining <= 0:
-                    st.session_state.break_time = True
-                    st.session_state.timer_start = time.time()
-                    update_progress(25, "Focus Session")
-                    st.success("🎉 Focus session complete! Great concentration!")
-                    st.balloons()
-                else:
-                    mins, secs = divmod(int(remaining), 60)
-                    st.markdown(f'<div class="focus-timer">🎯 Focus Time<br>{mins:02d}:{secs:02d}</div>', 
-                               unsafe_allow_html=True)
-        else:
-            st.markdown('<div class="focus-timer">⏱️ Ready to Focus?<br>25:00</div>', 
-                       unsafe_allow_html=True)
+        notice = st.session_state.pop('focus_notice', None)
+        if notice:
+            st.success(notice)
+            st.balloons()
+        # Only the countdown reruns every second, not the whole page
+        run_every = 1 if st.session_state.timer_active and os.getenv("STUDYQUEST_AUTO_REFRESH", "1") != "0" else None
+        st.fragment(run_every=run_every)(render_focus_timer)()
         
         # Timer controls
         col_a, col_b, col_c = st.columns(3)
@@ -1063,17 +1387,20 @@ with tab4:
                 st.session_state.timer_active = True
                 st.session_state.timer_start = time.time()
                 st.session_state.break_time = False
+                get_focus_scheduler().start(st.session_state.user_id)
                 st.rerun()
         
         with col_b:
             if st.button("⏸️ Pause", disabled=not st.session_state.timer_active):
                 st.session_state.timer_active = False
+                get_focus_scheduler().cancel(st.session_state.user_id)
         
         with col_c:
             if st.button("🔄 Reset"):
                 st.session_state.timer_active = False
                 st.session_state.timer_start = None
                 st.session_state.break_time = False
+                get_focus_scheduler().cancel(st.session_state.user_id)
                 st.rerun()
     
     with col2:
@@ -1088,14 +1415,11 @@ with tab4:
             st.success(tip)
         
         st.subheader("🎯 Focus Stats")
-        focus_sessions = st.session_state.user_data['subjects_studied'].get('Focus Session', 0) // 25
+        focus_sessions = st.session_state.user_data.subjects_studied.get('Focus Session', 0) // 25
         st.metric("Completed Sessions", focus_sessions)
 
 # Footer with credits
 st.markdown("---")
 
+end_rerun_profile()
 
-# Auto-refresh for timer
-if st.session_state.get('timer_active', False):
-    time.sleep(1)
-    st.rerun()
\ No newline at end of file
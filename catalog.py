@@ -0,0 +1,193 @@
+"""
+📚 CONTENT CATALOG
+Curated questions, badge tiers, quotes, facts and study tips live in a versioned
+JSON file (content/catalog.json) instead of app.py, so editing content doesn't
+restart anyone's session. A watcher polls the file and swaps in a new immutable
+Catalog snapshot; a rerun that already holds the old snapshot keeps using it.
+Derived indexes are rebuilt only for the subjects whose content changed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from models import Question
+from question_bank import DIFFICULTIES, validate_question
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = os.getenv("STUDYQUEST_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            "content", "catalog.json"))
+POLL_INTERVAL = 2.0
+BADGE_KINDS = ("xp", "streak", "subjects")
+
+BadgeTiers = Dict[str, Tuple[Tuple[int, str, str], ...]]
+
+
+class QuestionIndex:
+    """Questions sorted by difficulty rating so selection is a range query, not a scan"""
+
+    def __init__(self, questions: List[Question]):
+        self.questions = sorted(questions, key=lambda q: q.rating)
+        self.ratings = [q.rating for q in self.questions]
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def range(self, low: float, high: float) -> List[Question]:
+        start = bisect_left(self.ratings, low)
+        end = bisect_right(self.ratings, high)
+        return self.questions[start:end]
+
+
+class SubjectContent(NamedTuple):
+    name: str
+    keywords: Tuple[str, ...]
+    questions: Dict[str, Tuple[Question, ...]]  # per difficulty
+    index: QuestionIndex                         # every difficulty, by rating
+    digest: str                                  # hash of the raw entry, to spot edits
+
+
+def build_questions(items: List[Dict], subject: str, difficulty: str) -> Tuple[Question, ...]:
+    return tuple(Question.from_dict(validate_question({**item, "subject": subject, "difficulty": difficulty}))
+                 for item in items)
+
+
+def build_subject(entry: Dict, digest: str) -> SubjectContent:
+    name = str(entry["name"]).strip()
+    questions = {difficulty: build_questions(entry.get("questions", {}).get(difficulty, []), name, difficulty)
+                 for difficulty in DIFFICULTIES}
+    return SubjectContent(name, tuple(word.lower() for word in entry.get("keywords", [])), questions,
+                          QuestionIndex([q for group in questions.values() for q in group]), digest)
+
+
+def build_badges(raw: Dict) -> BadgeTiers:
+    tiers = {}
+    for kind in BADGE_KINDS:
+        entries = [(int(tier["threshold"]), str(tier["title"]), str(tier["description"])) for tier in raw.get(kind, [])]
+        if [threshold for threshold, _, _ in entries] != sorted(threshold for threshold, _, _ in entries):
+            raise ValueError(f"{kind} badge thresholds must be ascending")
+        tiers[kind] = tuple(entries)
+    return tiers
+
+
+def digest_of(entry) -> str:
+    return hashlib.sha1(json.dumps(entry, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Catalog:
+    """One immutable version of the content; never mutated after it's built"""
+
+    def __init__(self, version: int, subjects: Tuple[SubjectContent, ...], general: Tuple[Dict, ...],
+                 badges: BadgeTiers, quotes: Tuple[str, ...], facts: Tuple[str, ...], tips: Tuple[str, ...]):
+        self.version = version
+        self.subjects = subjects
+        self.general = general
+        self.badges = badges
+        self.quotes = quotes
+        self.facts = facts
+        self.tips = tips
+
+    def find_subject(self, topic: str) -> Optional[SubjectContent]:
+        """First subject with a keyword in the topic (catalog order decides ties)"""
+        topic = topic.lower()
+        for subject in self.subjects:
+            if any(word in topic for word in subject.keywords):
+                return subject
+        return None
+
+    def general_questions(self, topic: str, difficulty: str) -> Tuple[Question, ...]:
+        """Study-skills questions for topics no subject covers; '{topic}' is filled in"""
+        items = [{key: value.replace("{topic}", topic) if isinstance(value, str) else value
+                  for key, value in item.items()} for item in self.general]
+        return build_questions(items, topic, difficulty)
+
+    def questions(self, topic: str, difficulty: str) -> List[Question]:
+        subject = self.find_subject(topic)
+        return list(subject.questions[difficulty] if subject else self.general_questions(topic, difficulty))
+
+    def index(self, topic: str) -> QuestionIndex:
+        subject = self.find_subject(topic)
+        if subject:
+            return subject.index
+        return QuestionIndex([q for difficulty in DIFFICULTIES for q in self.general_questions(topic, difficulty)])
+
+
+def load_catalog(path: str = CATALOG_PATH, previous: Optional[Catalog] = None) -> Catalog:
+    """
+    Read and validate a catalog file; raises ValueError/OSError if it's unusable.
+    Subjects whose entries are unchanged since `previous` reuse its built questions and index.
+    """
+    with open(path, encoding="utf-8") as f:
+        try:
+            raw = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}") from e
+
+    reusable = {subject.digest: subject for subject in previous.subjects} if previous else {}
+    subjects, rebuilt = [], []
+    for entry in raw.get("subjects", []):
+        digest = digest_of(entry)
+        subject = reusable.get(digest)
+        if subject is None:
+            subject = build_subject(entry, digest)
+            rebuilt.append(subject.name)
+        subjects.append(subject)
+    if previous:
+        logger.info("Catalog v%s -> v%s, rebuilt %s", previous.version, raw.get("version"), rebuilt or "no subjects")
+
+    general = tuple(raw.get("general_questions", []))
+    build_questions(list(general), "{topic}", "medium")  # validate the templates up front
+    return Catalog(int(raw.get("version", 0)), tuple(subjects), general, build_badges(raw.get("badges", {})),
+                   tuple(raw.get("quotes", [])), tuple(raw.get("facts", [])), tuple(raw.get("tips", [])))
+
+
+class CatalogWatcher:
+    """Polls the catalog file's mtime and atomically publishes each valid new version"""
+
+    def __init__(self, path: str = CATALOG_PATH, interval: float = POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._stamp = self._file_stamp()
+        self._catalog = load_catalog(path)
+        self._stop = threading.Event()
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self) -> Catalog:
+        """The latest snapshot; hold on to it for a whole rerun so content can't change mid-page"""
+        return self._catalog
+
+    def check(self) -> bool:
+        """Reload if the file changed; a broken edit is logged and the old version stays live"""
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            catalog = load_catalog(self.path, self._catalog)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error("Keeping catalog v%s, %s is invalid: %s", self._catalog.version, self.path, e)
+            return False
+        self._catalog = catalog  # a single reference swap - readers see the old or the new, never a mix
+        return True
+
+    def start(self) -> "CatalogWatcher":
+        threading.Thread(target=self._watch, name="catalog-watcher", daemon=True).start()
+        return self
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,135 @@
+"""
+⏱️ FOCUS SESSION SCHEDULER
+Process-wide scheduler that completes Pomodoro focus sessions at their deadline,
+queueing the XP even if the user's browser tab is closed. Deadlines live in a
+hashed timing wheel, so starting, pausing and resetting a timer are O(1) no
+matter how many sessions are running.
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import storage
+from models import local_today
+
+logger = logging.getLogger(__name__)
+
+FOCUS_DURATION = 25 * 60  # seconds
+BREAK_DURATION = 5 * 60
+FOCUS_XP = 25
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel: a ring of slots advanced by one background thread per tick.
+    A timer lands in slot (cursor + ticks) % size with the number of full turns it
+    still has to wait, so schedule and cancel never touch other timers.
+    """
+
+    def __init__(self, tick: float = 1.0, size: int = 512):
+        self.tick = tick
+        self.size = size
+        self._slots: List[Dict[Hashable, Tuple[int, Callable]]] = [{} for _ in range(size)]
+        self._slot_of: Dict[Hashable, int] = {}
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="timing-wheel", daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], None]):
+        """Run callback after delay seconds, replacing any timer already registered under key"""
+        ticks = max(1, math.ceil(delay / self.tick))
+        with self._lock:
+            self._remove(key)
+            slot = (self._cursor + ticks) % self.size
+            self._slots[slot][key] = ((ticks - 1) // self.size, callback)
+            self._slot_of[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._remove(key) is not None
+
+    def fire_now(self, key: Hashable) -> bool:
+        """Run a pending timer immediately; False if it already fired or was cancelled"""
+        with self._lock:
+            callback = self._remove(key)
+        if callback is None:
+            return False
+        self._call(callback)
+        return True
+
+    def _remove(self, key: Hashable) -> Optional[Callable]:
+        slot = self._slot_of.pop(key, None)
+        if slot is None:
+            return None
+        return self._slots[slot].pop(key)[1]
+
+    def _advance(self) -> List[Callable]:
+        with self._lock:
+            self._cursor = (self._cursor + 1) % self.size
+            slot = self._slots[self._cursor]
+            due = [key for key, (rounds, _) in slot.items() if rounds == 0]
+            for key, (rounds, callback) in slot.items():
+                if rounds:
+                    slot[key] = (rounds - 1, callback)
+            return [self._remove(key) for key in due]
+
+    def _run(self):
+        next_tick = time.monotonic() + self.tick
+        while True:
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            # Catch up on every tick that passed, e.g. after the process was suspended
+            while next_tick <= time.monotonic():
+                for callback in self._advance():
+                    self._call(callback)
+                next_tick += self.tick
+
+    @staticmethod
+    def _call(callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Timer callback failed")
+
+
+class FocusScheduler:
+    """Queues focus-session XP at the deadline, server-side, exactly once per session"""
+
+    def __init__(self, focus_duration: float = FOCUS_DURATION, wheel: Optional[TimingWheel] = None):
+        self.focus_duration = focus_duration
+        self.wheel = wheel if wheel is not None else TimingWheel()
+        self._completed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def start(self, user_id: str):
+        self.wheel.schedule(user_id, self.focus_duration, lambda: self._complete(user_id))
+
+    def cancel(self, user_id: str):
+        self.wheel.cancel(user_id)
+
+    def finish_if_due(self, user_id: str) -> bool:
+        """Called when a client sees its deadline pass before the wheel reached it"""
+        return self.wheel.fire_now(user_id)
+
+    def pop_completed(self, user_id: str) -> bool:
+        """True once after a session of this user completed since the last check"""
+        with self._lock:
+            if user_id in self._completed:
+                self._completed.discard(user_id)
+                return True
+            return False
+
+    def _complete(self, user_id: str):
+        # Queue the award rather than rewriting the progress row, which the user's session may save over
+        with storage.open_db() as conn:
+            today = local_today(storage.user_timezone(conn, user_id))
+            storage.queue_award(conn, user_id, "Focus Session", FOCUS_XP, today.isoformat())
+            storage.record_event(conn, user_id, "focus", "Focus Session", xp=FOCUS_XP)
+        with self._lock:
+            self._completed.add(user_id)
@@ -0,0 +1,207 @@
+"""
+🔁 BULK IMPORT / EXPORT
+Streams question banks into the StudyQuest database and user data out of it.
+Every stage is a generator, so million-row files are processed in constant
+memory and written in batched transactions.
+
+Usage:
+    python import_export.py import questions.csv --difficulty medium
+    python import_export.py import deck.txt --format anki --subject Biology
+    python import_export.py export progress -o progress.jsonl
+    python import_export.py export events --since 2026-01-01 -o events.jsonl
+    python import_export.py export questions | python question_bank.py build /dev/stdin question_bank.snap
+"""
+
+import argparse
+import csv
+import html
+import json
+import os
+import random
+import re
+import sys
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import storage
+from models import ANSWER_LETTERS
+from question_bank import validate_question
+
+ANKI_DISTRACTOR_POOL = 50
+ANKI_DEFAULT_DIFFICULTY = "medium"  # Anki cards carry no difficulty; --difficulty overrides it
+MAX_REPORTED_ERRORS = 20
+
+
+# 📥 READERS - each yields (line number, raw item)
+def read_jsonl(path: str) -> Iterator[Tuple[int, Union[Dict, ValueError]]]:
+    """Yields (line, item); unparseable lines yield a ValueError instead, so they are counted and skipped"""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, ValueError(f"invalid JSON ({e.msg})")
+                continue
+            yield line_no, item if isinstance(item, dict) else ValueError("expected a JSON object")
+
+
+def read_csv(path: str) -> Iterator[Tuple[int, Union[Dict, ValueError]]]:
+    """Columns: subject, difficulty, question, option_a..option_d (or options split by '|'), answer, hint, xp, rating"""
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield reader.line_num, ValueError(f"unreadable CSV row ({e})")
+                continue
+            line_no = reader.line_num
+            if row.get("options"):
+                row["options"] = row["options"].split("|")
+            else:
+                row["options"] = [row.get(f"option_{letter.lower()}") for letter in ANSWER_LETTERS]
+                if None in row["options"]:
+                    row["options"] = []
+            yield line_no, row
+
+
+def clean_anki_field(text: str) -> str:
+    return html.unescape(re.sub(r"<[^>]+>", " ", text)).strip()
+
+
+def read_anki(path: str) -> Iterator[Tuple[int, Union[Dict, ValueError]]]:
+    """
+    Anki "Notes in Plain Text" export: front<TAB>back[<TAB>tags].
+    Cards are front/back only, so the 3 wrong options are drawn from the answers
+    of nearby cards in the same deck (a bounded rolling pool).
+    """
+    pool: deque = deque(maxlen=ANKI_DISTRACTOR_POOL)
+    pending: List[Tuple[int, str, str, str]] = []
+
+    def to_item(line_no: int, front: str, back: str, tags: str) -> Tuple[int, Dict]:
+        distractors = random.sample([answer for answer in set(pool) if answer != back], 3)
+        options = distractors + [back]
+        random.shuffle(options)
+        item = {"question": front, "options": options, "answer": ANSWER_LETTERS[options.index(back)]}
+        if tags:
+            item["subject"] = tags.split()[0].replace("_", " ")
+        return line_no, item
+
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 2:
+                yield line_no, ValueError("expected front<TAB>back")
+                continue
+            front, back = clean_anki_field(fields[0]), clean_anki_field(fields[1])
+            tags = fields[2].strip() if len(fields) > 2 else ""
+            pool.append(back)
+            pending.append((line_no, front, back, tags))
+            if len(set(pool)) >= 4:
+                for card in pending:
+                    yield to_item(*card)
+                pending.clear()
+    for line_no, *_ in pending:
+        yield line_no, ValueError("deck too small to build wrong options")
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv, "anki": read_anki}
+EXTENSIONS = {".jsonl": "jsonl", ".json": "jsonl", ".csv": "csv", ".txt": "anki", ".tsv": "anki"}
+
+
+def validated(items: Iterable[Tuple[int, Union[Dict, ValueError]]], defaults: Dict, counts: Counter) -> Iterator[Dict]:
+    """
+    Apply defaults and validate; invalid rows (and rows the reader couldn't parse) are counted
+    in counts["rejected"] and skipped - only the first few are reported, none are kept
+    """
+    for line_no, item in items:
+        try:
+            if isinstance(item, Exception):
+                raise item
+            yield validate_question({**defaults, **{k: v for k, v in item.items() if v not in (None, "")}})
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            counts["rejected"] += 1
+            if counts["rejected"] <= MAX_REPORTED_ERRORS:
+                print(f"⚠️ line {line_no}: {e or 'unreadable row'}", file=sys.stderr)
+
+
+def import_questions(path: str, fmt: Optional[str] = None, defaults: Optional[Dict] = None,
+                     batch_size: int = 5000, db_path: Optional[str] = None) -> Tuple[int, int]:
+    """Stream a question file into the database; returns (imported, rejected)"""
+    fmt = fmt or EXTENSIONS.get(os.path.splitext(path)[1].lower(), "jsonl")
+    defaults = dict(defaults or {})
+    if fmt == "anki":
+        defaults.setdefault("subject", os.path.splitext(os.path.basename(path))[0])
+        defaults.setdefault("difficulty", ANKI_DEFAULT_DIFFICULTY)
+    counts: Counter = Counter()
+    with storage.open_db(db_path) as conn:
+        imported = storage.insert_questions(conn, validated(READERS[fmt](path), defaults, counts), batch_size)
+    return imported, counts["rejected"]
+
+
+# 📤 EXPORTS
+def write_jsonl(rows: Iterable[Dict], out) -> int:
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def export(kind: str, out, since: Optional[str] = None, chunk_size: int = 1000,
+           db_path: Optional[str] = None) -> int:
+    with storage.open_db(db_path) as conn:
+        if kind == "progress":
+            rows = storage.iter_progress(conn, chunk_size)
+        elif kind == "events":
+            start = datetime.fromisoformat(since).timestamp() if since else 0
+            rows = storage.iter_events(conn, start, chunk_size)
+        else:
+            rows = storage.iter_questions(conn, chunk_size)
+        return write_jsonl(rows, out)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk import questions and export StudyQuest data")
+    parser.add_argument("--db", help=f"database path (default: {storage.DB_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="import questions from CSV, JSONL or an Anki text export")
+    importer.add_argument("files", nargs="+")
+    importer.add_argument("--format", choices=sorted(READERS), help="default: guessed from the file extension")
+    importer.add_argument("--subject", help="subject for rows that don't have one")
+    importer.add_argument("--difficulty", choices=["easy", "medium", "hard"],
+                          help=f"difficulty for rows that don't have one (Anki default: {ANKI_DEFAULT_DIFFICULTY})")
+    importer.add_argument("--batch-size", type=int, default=5000)
+
+    exporter = commands.add_parser("export", help="export data as JSONL")
+    exporter.add_argument("kind", choices=["progress", "events", "questions"])
+    exporter.add_argument("-o", "--output", help="output file (default: stdout)")
+    exporter.add_argument("--since", help="only events on or after this ISO date")
+    exporter.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        defaults = {key: value for key, value in (("subject", args.subject), ("difficulty", args.difficulty)) if value}
+        for path in args.files:
+            imported, rejected = import_questions(path, args.format, defaults, args.batch_size, args.db)
+            print(f"✅ {path}: imported {imported} questions, rejected {rejected}", file=sys.stderr)
+    else:
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        try:
+            count = export(args.kind, out, args.since, args.chunk_size, args.db)
+        finally:
+            if args.output:
+                out.close()
+        print(f"✅ Exported {count} {args.kind} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
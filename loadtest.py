@@ -0,0 +1,383 @@
+"""
+🏋️ LOAD TEST HARNESS
+Drives many headless StudyQuest sessions through realistic flows (generate a
+quest, answer it, open the dashboard, run a focus timer with its per-second
+reruns) against stub Cohere / quotable / numbersapi servers, then reports
+throughput, rerun latency percentiles and CPU / RSS per session.
+
+The app runs as a real `streamlit run` server, one replica, and every simulated
+user is a websocket client that speaks Streamlit's protocol, as a browser tab
+would. CPU and RSS are read from the server process (Linux /proc).
+
+Usage:
+    python loadtest.py --sessions 200 --concurrency 100
+    python loadtest.py --sessions 100 --api-latency 0.8 --failure-rate 0.1 --focus-seconds 10
+    python loadtest.py --sessions 50 --json > baseline.json
+    python loadtest.py --sessions 50 --fail-p90 0.5       # exit 1 if p90 rerun latency regresses
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+try:
+    import websockets
+except ImportError:  # dev-only dependency (requirements-dev.txt); streamlit's tornado server doesn't need it
+    websockets = None
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+TOPICS = ["Biology", "History", "Chemistry", "Physics", "Mathematics", "Computer Science", "Geography"]
+WIDGET_TYPES = ("button", "text_input", "selectbox", "radio")
+
+
+# 🧪 STUB APIS
+class StubHandler(BaseHTTPRequestHandler):
+    """Cohere chat, quotable and numbersapi lookalikes with configurable latency and failures"""
+
+    latency = 0.3
+    jitter = 0.5
+    failure_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay_or_fail(self) -> bool:
+        time.sleep(max(0.0, random.gauss(self.latency, self.latency * self.jitter)))
+        if random.random() < self.failure_rate:
+            self.send_error(503)
+            return True
+        return False
+
+    def _send(self, body: str, content_type: str = "application/json"):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        message = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}").get("message", "")
+        if self._delay_or_fail():
+            return
+        if "multiple choice question" in message and message.startswith("Create"):
+            count = int(message.split()[1]) if message.split()[1].isdigit() else 3
+            tag = random.randrange(10 ** 6)
+            text = "\n".join(f"Question: Stub question {tag}-{i}?\nA) one\nB) two\nC) three\nD) four\nAnswer: B"
+                             for i in range(count))
+        else:
+            text = "Hint: Look at the options that mention the key term.\nExplanation: Option B matches the definition."
+        self._send(json.dumps({"text": text}))
+
+    def do_GET(self):
+        if self._delay_or_fail():
+            return
+        if self.path.startswith("/random/trivia"):
+            self._send("42 is the answer to everything.", "text/plain")
+        elif self.path.startswith("/random"):
+            self._send(json.dumps({"content": "Keep going.", "author": "Stub"}))
+        else:
+            self.send_error(404)
+
+
+def start_stub_server(latency: float, jitter: float, failure_rate: float) -> ThreadingHTTPServer:
+    handler = type("ConfiguredStubHandler", (StubHandler,),
+                   {"latency": latency, "jitter": jitter, "failure_rate": failure_rate})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-api", daemon=True).start()
+    return server
+
+
+# 📏 MEASUREMENT
+class ServerProcess:
+    """The app under test, started with `streamlit run` on a free port"""
+
+    def __init__(self, env: Dict[str, str]):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless", "true",
+             "--server.port", str(self.port), "--browser.gatherUsageStats", "false"],
+            env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self.url = f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def wait_ready(self, timeout: float = 60):
+        stop_at = time.monotonic() + timeout
+        while time.monotonic() < stop_at:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"streamlit exited: {self.process.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("streamlit did not become healthy in time")
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.process.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")  # utime + stime
+
+    def rss(self) -> int:
+        with open(f"/proc/{self.process.pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class Stats:
+    def __init__(self):
+        self.reruns: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.live = 0
+        self.peak_live = 0
+        self.peak_rss = 0
+
+    def record(self, step: str, seconds: float, failed: bool):
+        self.reruns[step].append(seconds)
+        if failed:
+            self.errors[step] += 1
+
+    async def sample_rss(self, server: ServerProcess, interval: float = 0.2):
+        while True:
+            self.peak_rss = max(self.peak_rss, server.rss())
+            await asyncio.sleep(interval)
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] if ordered else 0.0
+
+
+# 🚶 SESSION FLOW
+class HeadlessSession:
+    """One browser tab: keeps widget values like the frontend and reruns the script on interaction"""
+
+    def __init__(self, websocket, user_id: str, stats: Stats, timeout: float):
+        self.websocket = websocket
+        self.query_string = f"user={user_id}"
+        self.stats = stats
+        self.timeout = timeout
+        self.values: Dict[str, tuple] = {}        # widget id -> (WidgetState value field, value)
+        self.widgets: List[tuple] = []            # (element type, proto) from the last run
+
+    def find(self, kind: str, label: str = "", key_part: str = "") -> Optional[object]:
+        return next((widget for widget_kind, widget in self.widgets
+                     if widget_kind == kind and label in widget.label and key_part in widget.id), None)
+
+    def set_value(self, widget, field: str, value):
+        if widget is not None:
+            self.values[widget.id] = (field, value)
+
+    async def rerun(self, step: str, trigger=None):
+        message = BackMsg()
+        message.rerun_script.query_string = self.query_string
+        for widget_id, (field, value) in self.values.items():
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            setattr(state, field, value)
+        if trigger is not None:
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = trigger.id
+            state.trigger_value = True
+        
+        started = time.perf_counter()
+        failed = False
+        widgets = []
+        try:
+            await self.websocket.send(message.SerializeToString())
+            while True:
+                forward = ForwardMsg()
+                forward.ParseFromString(await asyncio.wait_for(self.websocket.recv(), self.timeout))
+                kind = forward.WhichOneof("type")
+                if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                    element = forward.delta.new_element
+                    element_type = element.WhichOneof("type")
+                    if element_type == "exception":
+                        failed = True
+                    elif element_type in WIDGET_TYPES:
+                        widgets.append((element_type, getattr(element, element_type)))
+                elif kind == "script_finished":
+                    if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                        widgets = []  # st.rerun(): the server starts the next run itself
+                        continue
+                    failed = failed or forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR
+                    break
+        except (asyncio.TimeoutError, websockets.ConnectionClosed):
+            failed = True
+        self.stats.record(step, time.perf_counter() - started, failed)
+        self.widgets = widgets
+
+
+async def run_session(number: int, args, server: ServerProcess, stats: Stats):
+    async with websockets.connect(server.url, max_size=None) as websocket:
+        session = HeadlessSession(websocket, f"load-{number}", stats, args.timeout)
+        stats.live += 1
+        stats.peak_live = max(stats.peak_live, stats.live)
+        try:
+            await session.rerun("load")
+            session.set_value(session.find("text_input", "study"), "string_value", random.choice(TOPICS))
+            await session.rerun("type topic")
+            await session.rerun("generate quest", session.find("button", "Generate Quest"))
+
+            # Answer every question, one submit per rerun
+            for radio in [widget for kind, widget in session.widgets if kind == "radio" and ":answer_" in widget.id]:
+                session.set_value(radio, "string_value", random.choice(list(radio.options)))
+                submit_key = radio.id.rsplit("-", 1)[1].replace(":answer_", ":submit_")
+                await session.rerun("answer", session.find("button", key_part=submit_key))
+
+            await session.rerun("dashboard", session.find("button", "Get Random Learning Fact"))
+
+            if args.focus_seconds:
+                await session.rerun("start focus", session.find("button", "Start Focus"))
+                next_tick = time.monotonic() + 1
+                for _ in range(args.focus_seconds):
+                    await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+                    next_tick += 1
+                    await session.rerun("focus tick")
+                await session.rerun("reset focus", session.find("button", "Reset"))
+        finally:
+            stats.live -= 1
+
+
+async def run_warmup(server: ServerProcess):
+    """Load the app once so imports and caches aren't billed to the first sessions"""
+    async with websockets.connect(server.url, max_size=None) as websocket:
+        await HeadlessSession(websocket, "warmup", Stats(), 60).rerun("load")
+
+
+async def run_load(args, server: ServerProcess, stats: Stats):
+    limit = asyncio.Semaphore(args.concurrency)
+    sampler = asyncio.create_task(stats.sample_rss(server))
+
+    async def limited(number: int):
+        async with limit:
+            try:
+                await run_session(number, args, server, stats)
+            except (OSError, websockets.WebSocketException):
+                stats.record("connect", 0.0, True)
+
+    await asyncio.gather(*(limited(number) for number in range(args.sessions)))
+    sampler.cancel()
+
+
+# 📊 REPORT
+def build_report(args, stats: Stats, wall: float, cpu: float, baseline_rss: int) -> Dict:
+    all_reruns = [seconds for samples in stats.reruns.values() for seconds in samples]
+    steps = {}
+    for step, samples in stats.reruns.items():
+        steps[step] = {
+            "count": len(samples),
+            "errors": stats.errors.get(step, 0),
+            "p50_ms": round(percentile(samples, 50) * 1000, 1),
+            "p90_ms": round(percentile(samples, 90) * 1000, 1),
+            "p99_ms": round(percentile(samples, 99) * 1000, 1),
+            "max_ms": round(max(samples) * 1000, 1),
+        }
+    return {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 2),
+        "sessions_per_second": round(args.sessions / wall, 2),
+        "reruns_per_second": round(len(all_reruns) / wall, 2),
+        "rerun_p50_ms": round(percentile(all_reruns, 50) * 1000, 1),
+        "rerun_p90_ms": round(percentile(all_reruns, 90) * 1000, 1),
+        "rerun_p99_ms": round(percentile(all_reruns, 99) * 1000, 1),
+        "errors": sum(stats.errors.values()),
+        "cpu_seconds_per_session": round(cpu / args.sessions, 3),
+        "cpu_ms_per_rerun": round(cpu / max(1, len(all_reruns)) * 1000, 1),
+        "peak_live_sessions": stats.peak_live,
+        "rss_mb_per_live_session": round((stats.peak_rss - baseline_rss) / max(1, stats.peak_live) / 2 ** 20, 2),
+        "peak_rss_mb": round(stats.peak_rss / 2 ** 20, 1),
+        "steps": steps,
+    }
+
+
+def print_report(report: Dict):
+    print(f"🏋️ {report['sessions']} sessions, {report['concurrency']} concurrent, {report['wall_seconds']}s")
+    print(f"   throughput: {report['sessions_per_second']} sessions/s, {report['reruns_per_second']} reruns/s")
+    print(f"   rerun latency: p50 {report['rerun_p50_ms']}ms, p90 {report['rerun_p90_ms']}ms, "
+          f"p99 {report['rerun_p99_ms']}ms, errors {report['errors']}")
+    print(f"   cost: {report['cpu_seconds_per_session']} CPU s/session, {report['cpu_ms_per_rerun']} CPU ms/rerun, "
+          f"{report['rss_mb_per_live_session']} MB RSS/live session (peak {report['peak_rss_mb']} MB)")
+    print(f"   {'step':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, row in report["steps"].items():
+        print(f"   {step:<16}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>10}{row['p90_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['max_ms']:>10}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test StudyQuest with many headless sessions")
+    parser.add_argument("--sessions", type=int, default=100, help="total sessions to run")
+    parser.add_argument("--concurrency", type=int, default=25, help="sessions running at the same time")
+    parser.add_argument("--focus-seconds", type=int, default=5, help="per-second focus timer reruns per session")
+    parser.add_argument("--api-latency", type=float, default=0.3, help="mean stub API latency in seconds")
+    parser.add_argument("--api-jitter", type=float, default=0.5, help="latency standard deviation as a fraction of the mean")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of stub API calls answered with 503")
+    parser.add_argument("--no-ai", action="store_true", help="run without COHERE_API_KEY (curated questions only)")
+    parser.add_argument("--timeout", type=float, default=60, help="per-rerun timeout in seconds")
+    parser.add_argument("--db", help="database path (default: a temporary file)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--fail-p90", type=float, help="exit 1 if the overall p90 rerun latency exceeds this many seconds")
+    args = parser.parse_args(argv)
+
+    if websockets is None:
+        parser.error("the load test needs the 'websockets' package (pip install -r requirements-dev.txt)")
+
+    stub = start_stub_server(args.api_latency, args.api_jitter, args.failure_rate)
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    env = {
+        "COHERE_API_URL": f"{stub_url}/v1/chat",
+        "QUOTABLE_API_URL": stub_url,
+        "NUMBERS_API_URL": stub_url,
+        "STUDYQUEST_AUTO_REFRESH": "0",
+        "STUDYQUEST_DB": args.db or os.path.join(tempfile.mkdtemp(prefix="studyquest-load-"), "load.db"),
+        "COHERE_API_KEY": "" if args.no_ai else "loadtest",
+    }
+    server = ServerProcess(env)
+    try:
+        server.wait_ready()
+        asyncio.run(run_warmup(server))
+        stats = Stats()
+        baseline_rss = stats.peak_rss = server.rss()
+        started, cpu_started = time.perf_counter(), server.cpu_seconds()
+        asyncio.run(run_load(args, server, stats))
+        wall, cpu = time.perf_counter() - started, server.cpu_seconds() - cpu_started
+    finally:
+        server.stop()
+        stub.shutdown()
+
+    report = build_report(args, stats, wall, cpu, baseline_rss)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.fail_p90 is not None and report["rerun_p90_ms"] > args.fail_p90 * 1000:
+        print(f"❌ p90 rerun latency {report['rerun_p90_ms']}ms exceeds {args.fail_p90 * 1000:.0f}ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+🧩 COMPACT DATA MODELS
+Questions and user progress live in st.session_state, which Streamlit may copy
+and pickle, so they are tuple/slot-backed records instead of dicts of dicts:
+no per-object __dict__, no repeated string keys, and small pickles.
+"""
+
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+ANSWER_LETTERS = "ABCD"
+
+
+def intern_subject(subject: str) -> str:
+    """Subjects repeat across every session, so share one string object per name"""
+    return sys.intern(subject.strip())
+
+
+def local_today(timezone: str) -> date:
+    """The user's calendar date - streaks and daily XP roll over at their midnight, not the server's"""
+    try:
+        return datetime.now(ZoneInfo(timezone)).date()
+    except (ZoneInfoNotFoundError, ValueError):
+        return datetime.now(ZoneInfo("UTC")).date()
+
+
+class Question(NamedTuple):
+    question: str
+    options: Tuple[str, ...]
+    answer: int       # index into options
+    hint: str
+    xp: int
+    rating: int
+
+    @property
+    def answer_letter(self) -> str:
+        return ANSWER_LETTERS[self.answer]
+
+    @property
+    def correct_option(self) -> str:
+        return self.options[self.answer]
+
+    def is_correct(self, selected: Optional[str]) -> bool:
+        return selected == self.options[self.answer]
+
+    @classmethod
+    def from_dict(cls, data: Dict, rating: int = 1200) -> "Question":
+        """Build from the dict format used by the curated lists and AI parser"""
+        return cls(
+            data["question"],
+            tuple(data["options"]),
+            ANSWER_LETTERS.index(str(data["answer"]).strip().upper()[:1]),
+            data["hint"],
+            int(data.get("xp", 50)),
+            int(data.get("rating", rating)),
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "question": self.question,
+            "options": list(self.options),
+            "answer": self.answer_letter,
+            "hint": self.hint,
+            "xp": self.xp,
+            "rating": self.rating,
+        }
+
+
+class UserProgress:
+    """Per-user XP, streak, badges and per-subject stats"""
+
+    __slots__ = ("xp", "total_xp", "streak", "last_activity", "badges",
+                 "subjects_studied", "daily_xp", "skill", "timezone")
+
+    def __init__(self, xp: int = 0, total_xp: int = 0, streak: int = 0,
+                 last_activity: Optional[str] = None, badges: Optional[List[str]] = None,
+                 subjects_studied: Optional[Dict[str, int]] = None, daily_xp: int = 0,
+                 skill: Optional[Dict[str, float]] = None, timezone: str = "UTC"):
+        self.xp = xp
+        self.total_xp = total_xp
+        self.streak = streak
+        self.last_activity = last_activity
+        self.badges = badges if badges is not None else []
+        self.subjects_studied = {intern_subject(s): v for s, v in (subjects_studied or {}).items()}
+        self.daily_xp = daily_xp
+        self.skill = {intern_subject(s): v for s, v in (skill or {}).items()}
+        self.timezone = sys.intern(timezone)
+
+    def __reduce__(self):
+        # Pickle as a plain tuple of values rather than a dict of slot names
+        return (UserProgress, tuple(getattr(self, field) for field in self.__slots__))
+
+    def __repr__(self) -> str:
+        return f"UserProgress(total_xp={self.total_xp}, streak={self.streak}, subjects={len(self.subjects_studied)})"
+
+    def add_subject_xp(self, subject: str, xp: int):
+        subject = intern_subject(subject)
+        self.subjects_studied[subject] = self.subjects_studied.get(subject, 0) + xp
+
+    def add_xp(self, xp_by_subject: Dict[str, int], today: date):
+        """Apply one XP delta: extend or restart the streak, then update totals and subjects"""
+        if self.last_activity:
+            last_date = date.fromisoformat(self.last_activity)
+            if today == last_date:
+                pass  # Same day, maintain streak
+            elif today == last_date + timedelta(days=1):
+                self.streak += 1
+                self.daily_xp = 0
+            else:
+                self.streak = 1
+                self.daily_xp = 0
+        else:
+            self.streak = 1
+
+        xp_gained = sum(xp_by_subject.values())
+        self.xp += xp_gained
+        self.total_xp += xp_gained
+        self.daily_xp += xp_gained
+        self.last_activity = today.isoformat()
+        for subject, xp in xp_by_subject.items():
+            self.add_subject_xp(subject, xp)
+
+    def catch_up_rollover(self, day: date, badges: List[str]):
+        """
+        Apply a daily rollover to `day` that this copy missed (it was loaded before the rollover
+        ran): no activity since then means daily XP restarts, and a missed day breaks the streak.
+        Badges the rollover unlocked are kept
+        """
+        last_date = date.fromisoformat(self.last_activity) if self.last_activity else None
+        if last_date is not None and last_date < day:
+            self.daily_xp = 0
+            if last_date < day - timedelta(days=1):
+                self.streak = 0
+        self.badges.extend(badge for badge in badges if badge not in self.badges)
+
+    def unlock_badges(self, badge_tiers: Dict[str, Tuple[Tuple[int, str, str], ...]]) -> List[Tuple[str, str, str]]:
+        """
+        Add every badge whose threshold is met; badge_tiers maps "xp" / "streak" / "subjects" to
+        (threshold, title, description) tiers (see catalog.py). Returns the new (kind, title, description) ones
+        """
+        values = {"xp": self.total_xp, "streak": self.streak, "subjects": len(self.subjects_studied)}
+        unlocked = []
+        for kind, tiers in badge_tiers.items():
+            for threshold, title, desc in tiers:
+                if values[kind] >= threshold and title not in self.badges:
+                    self.badges.append(title)
+                    unlocked.append((kind, title, desc))
+        return unlocked
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "UserProgress":
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.__slots__}
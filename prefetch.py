@@ -0,0 +1,107 @@
+"""
+🔮 SPECULATIVE PREFETCH
+Starts slow background work (AI hints and wrong-answer explanations) while the
+user is still reading a quest, so the click that needs it is served from memory.
+Jobs are grouped per quest and cancelled as soon as that quest is replaced,
+unless another quest (possibly in another session) is waiting for the same result.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    Process-wide LRU of prefetched results plus the in-flight job of each key. A key can be
+    wanted by several groups (e.g. two sessions showing the same cached question); its job
+    is only cancelled once every group that wants it has been cancelled
+    """
+
+    def __init__(self, executor: Executor, max_entries: int = 2000):
+        self.executor = executor
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._inflight: Dict[Hashable, Tuple[threading.Event, Future]] = {}
+        self._wanted: Dict[Hashable, Set[str]] = {}     # key -> groups waiting for it
+        self._groups: Dict[str, Set[Hashable]] = {}     # group -> keys it waits for
+        self._lock = threading.Lock()
+
+    def submit(self, group: str, key: Hashable, fetch: Callable[[], Any]):
+        """Run fetch() in the background unless key is already cached; joins a job already in flight"""
+        with self._lock:
+            if key in self._results:
+                return
+            self._wanted.setdefault(key, set()).add(group)
+            self._groups.setdefault(group, set()).add(key)
+            if key in self._inflight:
+                return
+            cancelled = threading.Event()
+            future = self.executor.submit(self._run, key, fetch, cancelled)
+            self._inflight[key] = (cancelled, future)
+        future.add_done_callback(lambda future: self._finished(key, future))
+
+    def _run(self, key: Hashable, fetch: Callable[[], Any], cancelled: threading.Event):
+        if cancelled.is_set():
+            return
+        try:
+            value = fetch()
+        except Exception:
+            logger.exception("Prefetch of %r failed", key)
+            return
+        if value is not None:
+            with self._lock:
+                self._results[key] = value
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+
+    def _forget(self, key: Hashable):
+        """Drop key's job bookkeeping; call with the lock held"""
+        self._inflight.pop(key, None)
+        for group in self._wanted.pop(key, ()):
+            keys = self._groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[group]
+
+    def _finished(self, key: Hashable, future: Future):
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry and entry[1] is future:  # not a job that was cancelled and replaced
+                self._forget(key)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The prefetched value, or None if it isn't ready; never blocks"""
+        with self._lock:
+            value = self._results.get(key)
+            if value is not None:
+                self._results.move_to_end(key)
+            return value
+
+    def cancel(self, group: str) -> int:
+        """
+        Withdraw a group from its keys and stop the jobs no other group still wants,
+        if they haven't started yet; returns how many were cancelled
+        """
+        abandoned = []
+        with self._lock:
+            for key in self._groups.pop(group, ()):
+                wanted = self._wanted.get(key)
+                if wanted is None:
+                    continue
+                wanted.discard(group)
+                if not wanted:
+                    abandoned.append(self._inflight.get(key))
+                    self._forget(key)
+        cancelled = 0
+        for entry in abandoned:
+            if entry:
+                entry[0].set()
+                cancelled += entry[1].cancel()
+        return cancelled
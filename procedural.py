@@ -0,0 +1,328 @@
+"""
+🧮 PROCEDURAL QUESTION GENERATOR
+Builds unlimited math and computer science questions locally: parameters are
+sampled in NumPy batches, the correct answers and plausible wrong answers
+(common mistakes and near misses) are computed vectorised, and only the final
+string formatting happens per question. No API calls needed.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import ANSWER_LETTERS, Question
+from question_bank import DIFFICULTY_RATINGS, base_xp
+
+MATH_KEYWORDS = ['math', 'maths', 'mathematics', 'algebra', 'geometry', 'calculus', 'arithmetic', 'percent',
+                 'percentage', 'equation', 'derivative', 'integral']
+# Whole phrases only: "binary trees" or "binary fission" must not get number-base questions
+CS_KEYWORDS = ['algorithm', 'big-o', 'big o', 'complexity', 'binary number', 'binary to decimal', 'number base',
+               'data structure']
+
+
+def _phrase_pattern(phrases: List[str]) -> "re.Pattern":
+    """Any of the phrases as whole words, optionally plural"""
+    return re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in phrases) + r")s?\b")
+
+
+MATH_PATTERN = _phrase_pattern(MATH_KEYWORDS)
+CS_PATTERN = _phrase_pattern(CS_KEYWORDS)
+
+SUPERSCRIPTS = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+
+# (operation, time complexity) facts for Big-O questions
+BIG_O_CLASSES = ["O(1)", "O(log n)", "O(n)", "O(n log n)", "O(n²)", "O(2ⁿ)"]
+BIG_O_FACTS = {
+    "medium": [
+        ("accessing an array element by index", "O(1)"),
+        ("pushing onto a stack", "O(1)"),
+        ("an average hash table lookup", "O(1)"),
+        ("binary search on a sorted array", "O(log n)"),
+        ("linear search through an unsorted list", "O(n)"),
+        ("finding the maximum of an unsorted array", "O(n)"),
+        ("merge sort", "O(n log n)"),
+        ("bubble sort in the worst case", "O(n²)"),
+    ],
+    "hard": [
+        ("inserting into a balanced binary search tree", "O(log n)"),
+        ("inserting into a binary heap", "O(log n)"),
+        ("building a binary heap from n items (heapify)", "O(n)"),
+        ("heap sort", "O(n log n)"),
+        ("quick sort in the worst case", "O(n²)"),
+        ("comparing every pair of items in a list", "O(n²)"),
+        ("naive recursive Fibonacci", "O(2ⁿ)"),
+        ("listing every subset of n items", "O(2ⁿ)"),
+    ],
+}
+
+# A generator returns (question texts, correct answers, distractors (n x 3), hints)
+Batch = Tuple[List[str], List[str], List[List[str]], List[str]]
+
+
+def find_subject(topic: str) -> Optional[str]:
+    """'math' or 'cs' when the topic can be served procedurally"""
+    topic_lower = topic.lower()
+    if MATH_PATTERN.search(topic_lower):
+        return "math"
+    if CS_PATTERN.search(topic_lower):
+        return "cs"
+    return None
+
+
+def _pick_offsets(rng: np.random.Generator, n: int, offsets: List[int]) -> np.ndarray:
+    """Three distinct non-zero offsets per row"""
+    return rng.permuted(np.tile(offsets, (n, 1)), axis=1)[:, :3]
+
+
+def _fmt(values) -> List[str]:
+    return [f"{value:g}" for value in np.asarray(values).ravel().tolist()]
+
+
+def _rows(matrix: np.ndarray, fmt: Callable = str) -> List[List[str]]:
+    return [[fmt(value) for value in row] for row in matrix.tolist()]
+
+
+def _polynomial(coefficients: List[int]) -> str:
+    """Format coefficients (index = power) as e.g. '3x² + 4x - 5'"""
+    terms = []
+    for power in range(len(coefficients) - 1, -1, -1):
+        c = coefficients[power]
+        if c == 0:
+            continue
+        magnitude = abs(c)
+        body = "" if power == 0 else "x" if power == 1 else "x" + str(power).translate(SUPERSCRIPTS)
+        term = str(magnitude) if power == 0 else (body if magnitude == 1 else f"{magnitude}{body}")
+        if not terms:
+            terms.append(("-" if c < 0 else "") + term)
+        else:
+            terms.append(("- " if c < 0 else "+ ") + term)
+    return " ".join(terms) or "0"
+
+
+# ➕ MATH GENERATORS
+def _arithmetic_hint(x: int, symbol: str, y: int) -> str:
+    if symbol != "×":
+        return "Work it out step by step, then check by estimating"
+    if y < 10:
+        return f"Think: ({x} × 10) - ({x} × {10 - y})"
+    if y > 10:
+        return f"Think: ({x} × 10) + ({x} × {y - 10})"
+    return "Multiplying by 10 just adds a zero to the end"
+
+
+def arithmetic(rng: np.random.Generator, n: int) -> Batch:
+    a = rng.integers(2, 13, n)
+    b = rng.integers(2, 13, n)
+    op = rng.integers(0, 3, n)
+    big_a = a * rng.integers(2, 9, n)
+    left = np.where(op == 2, a, big_a)
+    answers = np.select([op == 0, op == 1], [left + b, left - b], left * b)
+    distractors = answers[:, None] + _pick_offsets(rng, n, [-10, -2, -1, 1, 2, 10])
+    symbols = np.array(["+", "-", "×"])[op]
+    texts = [f"What is {x} {s} {y}?" for x, s, y in zip(left.tolist(), symbols.tolist(), b.tolist())]
+    hints = [_arithmetic_hint(x, s, y) for x, s, y in zip(left.tolist(), symbols.tolist(), b.tolist())]
+    return texts, _fmt(answers), _rows(distractors), hints
+
+
+def percentage(rng: np.random.Generator, n: int) -> Batch:
+    percent = rng.integers(1, 20, n) * 5
+    base = rng.integers(1, 25, n) * 20
+    answers = percent * base // 100
+    candidates = np.column_stack([answers + 5, answers - 5, answers * 2, answers + 10, base // percent.clip(1) + answers])
+    distractors = rng.permuted(candidates, axis=1)[:, :3]
+    texts = [f"What is {p}% of {b}?" for p, b in zip(percent.tolist(), base.tolist())]
+    hints = [f"Convert {p}% to a decimal ({p / 100:g}) and multiply by {b}" for p, b in zip(percent.tolist(), base.tolist())]
+    return texts, _fmt(answers), _rows(distractors), hints
+
+
+def rectangle_area(rng: np.random.Generator, n: int) -> Batch:
+    length = rng.integers(3, 20, n)
+    width = rng.integers(2, 15, n)
+    answers = length * width
+    candidates = np.column_stack([2 * (length + width), length + width, answers + length, answers - width])
+    distractors = rng.permuted(candidates, axis=1)[:, :3]
+    texts = [f"If a rectangle has length {l} and width {w}, what is its area?" for l, w in zip(length.tolist(), width.tolist())]
+    hints = ["Area of rectangle = length × width"] * n
+    return texts, _fmt(answers), _rows(distractors), hints
+
+
+def triangle_area(rng: np.random.Generator, n: int) -> Batch:
+    base = rng.integers(2, 13, n) * 2
+    height = rng.integers(3, 20, n)
+    answers = base * height // 2
+    candidates = np.column_stack([base * height, base + height, answers + height, answers - base // 2])
+    distractors = rng.permuted(candidates, axis=1)[:, :3]
+    texts = [f"What is the area of a triangle with base {b} and height {h}?" for b, h in zip(base.tolist(), height.tolist())]
+    hints = ["Area of triangle = ½ × base × height"] * n
+    return texts, _fmt(answers), _rows(distractors), hints
+
+
+def circle_area(rng: np.random.Generator, n: int) -> Batch:
+    radius = rng.integers(3, 16, n)
+    answers = radius ** 2
+    candidates = np.column_stack([2 * radius, radius, (radius + 1) ** 2, 2 * radius ** 2])
+    distractors = rng.permuted(candidates, axis=1)[:, :3]
+    texts = [f"What is the area of a circle with radius {r}?" for r in radius.tolist()]
+    hints = [f"Use the formula A = πr², so A = π × {r}²" for r in radius.tolist()]
+    return (texts, [f"{a}π" for a in answers.tolist()],
+            _rows(distractors, lambda value: f"{value}π"), hints)
+
+
+def linear_equation(rng: np.random.Generator, n: int) -> Batch:
+    a = rng.integers(2, 10, n)
+    x = rng.integers(-9, 13, n)
+    b = rng.integers(1, 21, n) * rng.choice([-1, 1], n)
+    c = a * x + b
+    distractors = x[:, None] + _pick_offsets(rng, n, [-3, -2, -1, 1, 2, 3])
+    texts = [f"If {p}x {'+' if q > 0 else '-'} {abs(q)} = {r}, what is the value of x?"
+             for p, q, r in zip(a.tolist(), b.tolist(), c.tolist())]
+    hints = [f"{'Subtract' if q > 0 else 'Add'} {abs(q)} {'from' if q > 0 else 'to'} both sides first: {p}x = {r - q}, then divide by {p}"
+             for p, q, r in zip(a.tolist(), b.tolist(), c.tolist())]
+    return (texts, [f"x = {value}" for value in x.tolist()],
+            _rows(distractors, lambda value: f"x = {value}"), hints)
+
+
+def derivative(rng: np.random.Generator, n: int) -> Batch:
+    coefficients = rng.integers(-6, 7, (n, 4))
+    coefficients[:, 3] = rng.integers(1, 5, n)  # keep it a cubic
+    powers = np.arange(4)
+    answer = coefficients[:, 1:] * powers[1:]
+    no_multiply = coefficients[:, 1:]                              # lowered the power, forgot the coefficient
+    no_lowering = coefficients * powers                            # multiplied, kept the power
+    kept_constant = answer.copy()                                  # forgot that constants vanish
+    kept_constant[:, 0] += np.where(coefficients[:, 0] == 0, rng.integers(1, 6, n), coefficients[:, 0])
+    texts = [f"What is the derivative of {_polynomial(row)}?" for row in coefficients.tolist()]
+    answers = [_polynomial(row) for row in answer.tolist()]
+    distractors = [[_polynomial(p), _polynomial(q), _polynomial(r)]
+                   for p, q, r in zip(no_multiply.tolist(), no_lowering.tolist(), kept_constant.tolist())]
+    hints = ["Use power rule: d/dx(xⁿ) = nxⁿ⁻¹ for each term"] * n
+    return texts, answers, distractors, hints
+
+
+def integral(rng: np.random.Generator, n: int) -> Batch:
+    antiderivative = rng.integers(-9, 10, (n, 4))
+    antiderivative[:, 0] = 0
+    antiderivative[:, 3] = rng.integers(1, 4, n)
+    powers = np.arange(4)
+    integrand = antiderivative[:, 1:] * powers[1:]               # chosen so the integral has whole coefficients
+    no_divide = np.column_stack([np.zeros(n, int), integrand])   # raised the power, forgot to divide
+    differentiated = np.column_stack([integrand[:, 1:] * powers[1:3], np.zeros(n, int)])
+    halved = np.column_stack([np.zeros(n, int), integrand // 2])
+    texts = [f"What is the integral of ({_polynomial(row)}) dx?" for row in integrand.tolist()]
+    answers = [f"{_polynomial(row)} + C" for row in antiderivative.tolist()]
+    distractors = [[f"{_polynomial(p)} + C", f"{_polynomial(q)} + C", f"{_polynomial(r)} + C"]
+                   for p, q, r in zip(no_divide.tolist(), differentiated.tolist(), halved.tolist())]
+    hints = ["Reverse the power rule: ∫xⁿ dx = xⁿ⁺¹/(n+1) + C"] * n
+    return texts, answers, distractors, hints
+
+
+# 💻 COMPUTER SCIENCE GENERATORS
+def binary_to_decimal(rng: np.random.Generator, n: int) -> Batch:
+    values = rng.integers(5, 256, n)
+    distractors = values[:, None] + _pick_offsets(rng, n, [-4, -2, -1, 1, 2, 4, 8])
+    texts = [f"What is the binary number {v:b} in decimal?" for v in values.tolist()]
+    hints = ["Add up the powers of two (1, 2, 4, 8, ...) for every 1, reading from the right"] * n
+    return texts, _fmt(values), _rows(distractors), hints
+
+
+def big_o(difficulty: str) -> Callable[[np.random.Generator, int], Batch]:
+    facts = BIG_O_FACTS[difficulty]
+
+    def generate(rng: np.random.Generator, n: int) -> Batch:
+        picks = rng.integers(0, len(facts), n)
+        classes = np.array(BIG_O_CLASSES)
+        shuffled = rng.permuted(np.tile(classes, (n, 1)), axis=1)
+        texts, answers, distractors = [], [], []
+        for pick, row in zip(picks.tolist(), shuffled.tolist()):
+            operation, answer = facts[pick]
+            texts.append(f"What is the time complexity of {operation}?")
+            answers.append(answer)
+            distractors.append([option for option in row if option != answer][:3])
+        hints = ["Count how the number of steps grows as the input size n doubles"] * n
+        return texts, answers, distractors, hints
+
+    return generate
+
+
+GROWTH_CLASSES = np.array(["O(n)", "O(n²)", "O(n³)"])
+BASE_SIZES = np.array([100, 500, 1000, 2000, 5000])
+
+
+def scaling(rng: np.random.Generator, n: int) -> Batch:
+    exponent = rng.integers(1, 4, n)
+    factor = rng.integers(2, 11, n)
+    seconds = rng.integers(1, 10, n)
+    size = rng.choice(BASE_SIZES, n)
+    answers = seconds * factor ** exponent
+    candidates = np.column_stack([seconds * factor ** (exponent - 1), seconds * factor ** (exponent + 1),
+                                  seconds * (factor + 1) ** exponent, answers * 2])
+    distractors = rng.permuted(candidates, axis=1)[:, :3]
+    texts = [f"An {c} algorithm takes {t} seconds on {m:,} items. Roughly how long will it take on {m * k:,} items?"
+             for c, t, m, k in zip(GROWTH_CLASSES[exponent - 1].tolist(), seconds.tolist(), size.tolist(), factor.tolist())]
+    hints = [f"The input is {k}× bigger - how many times more steps does {c} mean?"
+             for c, k in zip(GROWTH_CLASSES[exponent - 1].tolist(), factor.tolist())]
+    return (texts, [f"{a:,} seconds" for a in answers.tolist()],
+            _rows(distractors, lambda value: f"{value:,} seconds"), hints)
+
+
+def binary_search_steps(rng: np.random.Generator, n: int) -> Batch:
+    size = (10 ** rng.uniform(1, 6, n)).astype(np.int64)
+    answers = np.floor(np.log2(size)).astype(np.int64) + 1  # worst case: one comparison per halving
+    distractors = answers[:, None] + _pick_offsets(rng, n, [-2, -1, 1, 2])
+    texts = [f"At most how many comparisons does binary search need to find an item in a sorted array of {m:,} items?"
+             for m in size.tolist()]
+    hints = ["Each comparison halves what's left - how many halvings until one item remains?"] * n
+    return texts, _fmt(answers), _rows(distractors), hints
+
+
+GENERATORS: Dict[str, Dict[str, List[Callable]]] = {
+    "math": {
+        "easy": [arithmetic, percentage, rectangle_area],
+        "medium": [linear_equation, circle_area, triangle_area, percentage],
+        "hard": [derivative, integral],
+    },
+    "cs": {
+        "easy": [binary_to_decimal],
+        "medium": [big_o("medium"), binary_to_decimal],
+        "hard": [big_o("hard"), scaling, binary_search_steps],
+    },
+}
+
+
+def _assemble(rng: np.random.Generator, batch: Batch, difficulty: str) -> List[Question]:
+    """Place each correct answer at a random position among its distractors"""
+    texts, answers, distractors, hints = batch
+    positions = rng.integers(0, 4, len(texts)).tolist()
+    questions = []
+    for text, answer, wrong, hint, position in zip(texts, answers, distractors, hints, positions):
+        options = list(wrong)
+        options.insert(position, answer)
+        if len(set(options)) < 4:
+            continue  # a distractor collided with the answer or another distractor
+        questions.append(Question(
+            question=text,
+            options=tuple(f"{letter}) {option}" for letter, option in zip(ANSWER_LETTERS, options)),
+            answer=position,
+            hint=hint,
+            xp=base_xp(difficulty),
+            rating=DIFFICULTY_RATINGS[difficulty],
+        ))
+    return questions
+
+
+def generate_questions(subject: str, difficulty: str, count: int = 3,
+                       rng: Optional[np.random.Generator] = None) -> List[Question]:
+    """Generate count questions, mixing every question type for the subject and difficulty"""
+    rng = rng or np.random.default_rng()
+    generators = GENERATORS[subject][difficulty]
+    questions: List[Question] = []
+    while len(questions) < count:
+        needed = count - len(questions)
+        kinds = rng.integers(0, len(generators), needed + needed // 4 + 1)
+        for kind, generator in enumerate(generators):
+            n = int((kinds == kind).sum())
+            if n:
+                questions.extend(_assemble(rng, generator(rng, n), difficulty))
+    order = rng.permutation(len(questions))[:count]
+    return [questions[i] for i in order.tolist()]
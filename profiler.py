@@ -0,0 +1,155 @@
+"""
+🔬 RERUN PROFILER
+Operator-only sampling profiler for single script reruns. A background thread
+samples the script thread's stack every few milliseconds and writes collapsed
+stacks (flamegraph.pl / speedscope format), a flamegraph SVG and, optionally,
+a tracemalloc allocation snapshot. Nothing runs unless a profile is started.
+"""
+
+import html
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+TOP_ALLOCATIONS = 30
+
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+_tracemalloc_lock = threading.Lock()
+
+
+def _start_tracemalloc():
+    """tracemalloc is process-wide, so overlapping profiles share one tracing session"""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+class RerunProfiler:
+    """Samples one thread's stack until stopped, then writes its profile files to out_dir"""
+
+    def __init__(self, label: str, out_dir: str, interval: float = 0.005,
+                 root_file: Optional[str] = None, trace_allocations: bool = True, max_seconds: float = 120):
+        self.label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label)
+        self.out_dir = out_dir
+        self.interval = interval
+        self.root_file = os.path.abspath(root_file) if root_file else None
+        self.trace_allocations = trace_allocations
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name=f"profiler-{self.label}", daemon=True)
+        self._started = 0.0
+
+    def start(self) -> "RerunProfiler":
+        if self.trace_allocations:
+            _start_tracemalloc()
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        stop_at = time.perf_counter() + self.max_seconds  # a rerun that never finishes stops sampling
+        while not self._stop.wait(self.interval) and time.perf_counter() < stop_at:
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                if self.root_file and os.path.abspath(code.co_filename) == self.root_file and code.co_name == "<module>":
+                    break  # don't include Streamlit's script runner above the app
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> List[str]:
+        """Stop sampling and write <label>.folded, <label>.svg and <label>.alloc.txt; returns the paths"""
+        if self._stop.is_set():
+            return []
+        self._stop.set()
+        self._thread.join()
+        elapsed = time.perf_counter() - self._started
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, self.label)
+        paths = [write_collapsed(self.stacks, base + ".folded"),
+                 write_flamegraph_svg(self.stacks, base + ".svg", f"{self.label} ({elapsed * 1000:.0f} ms)")]
+        if self.trace_allocations:
+            snapshot = tracemalloc.take_snapshot()
+            _stop_tracemalloc()
+            paths.append(write_allocations(snapshot, base + ".alloc.txt"))
+        return paths
+
+
+def write_collapsed(stacks: Dict[str, int], path: str) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+def write_allocations(snapshot: tracemalloc.Snapshot, path: str) -> str:
+    stats = snapshot.filter_traces([tracemalloc.Filter(False, __file__)]).statistics("lineno")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{sum(stat.size for stat in stats) / 1024:.1f} KiB traced in {len(stats)} lines\n\n")
+        for stat in stats[:TOP_ALLOCATIONS]:
+            f.write(f"{stat}\n")
+    return path
+
+
+def write_flamegraph_svg(stacks: Dict[str, int], path: str, title: str,
+                         width: int = 1200, row_height: int = 16) -> str:
+    """Minimal flamegraph: one row per stack depth, each frame as wide as its sample share"""
+    tree: Dict = {"count": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = tree
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"count": 0, "children": {}})
+            node["count"] += count
+
+    rects = []
+
+    def layout(node: Dict, x: float, depth: int):
+        for name, child in sorted(node["children"].items()):
+            w = width * child["count"] / max(1, tree["count"])
+            if w >= 0.5:
+                rects.append((x, depth, w, name, child["count"]))
+                layout(child, x, depth + 1)
+            x += w
+
+    layout(tree, 0.0, 0)
+    depth = max((rect[1] for rect in rects), default=0) + 1
+    height = (depth + 2) * row_height
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">\n')
+        f.write(f'<text x="4" y="{row_height - 4}">{html.escape(title)} - {tree["count"]} samples</text>\n')
+        for x, level, w, name, count in rects:
+            y = height - (level + 1) * row_height
+            hue = 20 + hash(name) % 40
+            label = html.escape(name)
+            f.write(f'<g><title>{label} - {count} samples ({100 * count / tree["count"]:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" fill="hsl({hue},90%,60%)"/>')
+            if w > 40:
+                f.write(f'<text x="{x + 3:.1f}" y="{y + row_height - 4}">{html.escape(name[:int(w / 7)])}</text>')
+            f.write('</g>\n')
+        f.write('</svg>\n')
+    return path
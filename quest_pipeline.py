@@ -0,0 +1,119 @@
+"""
+🔀 MULTI-SOURCE QUEST PIPELINE
+Runs every question source (AI, cached AI, procedural, compiled bank, curated)
+concurrently and streams their results through filter -> dedup -> rank stages.
+The pipeline returns as soon as it has k acceptable questions that no slower,
+better-ranked source could still improve on (or once its patience runs out),
+and records which source served each question.
+"""
+
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Callable, Dict, Hashable, List, NamedTuple, Tuple
+
+from models import Question
+
+
+class QuestionSource(NamedTuple):
+    name: str
+    rank: int                                          # lower is preferred
+    fetch: Callable[[int, float], List[Question]]      # (count, monotonic deadline) -> questions
+
+
+class QuestResult(NamedTuple):
+    questions: List[Question]
+    sources: List[str]                                 # source name for each question
+
+    def source_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for name in self.sources:
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+def is_acceptable(question: Question) -> bool:
+    """Filter stage: a usable multiple choice question"""
+    return (bool(question.question.strip()) and len(question.options) == 4
+            and len(set(question.options)) == 4 and 0 <= question.answer < 4)
+
+
+def dedup_key(question: Question) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", question.question.lower()).strip()
+
+
+def run_pipeline(sources: List[QuestionSource], k: int, executor: Executor,
+                 deadline: float, patience: float) -> QuestResult:
+    """
+    Race all sources. Accepted questions are ranked by (source rank, arrival order);
+    we stop once the top k can't be beaten by a still-running better-ranked source,
+    once `patience` seconds have passed with k questions in hand, or at the deadline.
+    """
+    started = time.monotonic()
+    patience_at = min(deadline, started + patience)
+    futures = {executor.submit(source.fetch, k, deadline): source for source in sources}
+    pending = set(futures)
+    accepted: List[Tuple[int, int, Question, str]] = []
+    seen = set()
+
+    def settled() -> bool:
+        if len(accepted) < k:
+            return False
+        worst_rank = sorted(accepted, key=lambda item: item[:2])[k - 1][0]
+        return (time.monotonic() >= patience_at
+                or all(futures[future].rank >= worst_rank for future in pending))
+
+    try:
+        while pending and not settled():
+            stop_at = patience_at if len(accepted) >= k else deadline
+            if time.monotonic() >= stop_at:
+                break
+            done, pending = wait(pending, timeout=stop_at - time.monotonic(), return_when=FIRST_COMPLETED)
+            for future in done:
+                source = futures[future]
+                try:
+                    questions = future.result()
+                except Exception:
+                    continue
+                for question in questions or []:
+                    key = dedup_key(question)
+                    if key in seen or not is_acceptable(question):
+                        continue
+                    seen.add(key)
+                    accepted.append((source.rank, len(accepted), question, source.name))
+    finally:
+        for future in pending:
+            future.cancel()
+
+    best = sorted(accepted, key=lambda item: item[:2])[:k]
+    return QuestResult([item[2] for item in best], [item[3] for item in best])
+
+
+class QuestionCache:
+    """Process-wide LRU of AI-generated questions, so repeated topics skip the API"""
+
+    def __init__(self, max_keys: int = 500, per_key: int = 30):
+        self.max_keys = max_keys
+        self.per_key = per_key
+        self._entries: "OrderedDict[Hashable, List[Question]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key: Hashable, questions: List[Question]):
+        with self._lock:
+            entry = self._entries.pop(key, [])
+            known = {dedup_key(question) for question in entry}
+            entry.extend(question for question in questions if dedup_key(question) not in known)
+            self._entries[key] = entry[-self.per_key:]
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+
+    def sample(self, key: Hashable, count: int) -> List[Question]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return []
+            self._entries.move_to_end(key)
+            return random.sample(entry, min(count, len(entry)))
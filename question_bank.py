@@ -0,0 +1,253 @@
+"""
+📦 QUESTION BANK SNAPSHOTS
+Compiles a curated question bank (JSONL) into a compact binary snapshot that
+every worker can mmap read-only, so the OS shares the pages between processes.
+
+Snapshot layout (little-endian):
+    header          magic, counts and section offsets
+    string offsets  (n_strings + 1) x uint32, deduplicated string table
+    string data     UTF-8 bytes
+    records         fixed-width question records, sorted by subject/difficulty/rating
+    groups          (subject, difficulty) -> contiguous record range
+
+Questions are only turned into Question records when they are actually served.
+
+Usage:
+    python question_bank.py build questions.jsonl question_bank.snap
+"""
+
+import argparse
+import json
+import mmap
+import random
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import ANSWER_LETTERS, Question
+
+DIFFICULTY_RATINGS = {"easy": 800, "medium": 1200, "hard": 1600}
+DIFFICULTIES = list(DIFFICULTY_RATINGS)
+
+MAGIC = b"SQBANK01"
+HEADER = struct.Struct("<8sIIIIIII")    # magic, n_strings, n_questions, n_groups, 4 section offsets
+OFFSET = struct.Struct("<I")
+RECORD = struct.Struct("<6IHHBB")       # question, 4 options, hint, rating, xp, answer, difficulty
+MAX_RATING = MAX_XP = 0xFFFF            # both packed as uint16
+GROUP = struct.Struct("<4I")            # subject string id, difficulty, first record, record count
+
+
+def base_xp(difficulty: str) -> int:
+    return 40 if difficulty == "easy" else 50 if difficulty == "medium" else 60
+
+
+def label_option(letter: str, option) -> str:
+    """Options are shown as 'A) ...'; add the label when the source left it out"""
+    text = str(option).strip()
+    return text if text[:2] == f"{letter})" else f"{letter}) {text}"
+
+
+def validate_question(item: Dict) -> Dict:
+    """Check a raw bank item and fill in defaults; raises ValueError when it is unusable"""
+    subject = str(item.get("subject", "")).strip()
+    difficulty = str(item.get("difficulty", "")).strip().lower()
+    question = str(item.get("question", "")).strip()
+    options = item.get("options") or []
+    answer = str(item.get("answer", "")).strip().upper()[:1]
+    if not subject:
+        raise ValueError("missing subject")
+    if difficulty not in DIFFICULTY_RATINGS:
+        raise ValueError(f"unknown difficulty {difficulty!r}")
+    if not question:
+        raise ValueError("missing question text")
+    if len(options) != 4 or not all(str(option).strip() for option in options):
+        raise ValueError("questions need exactly 4 non-empty options")
+    if not answer or answer not in ANSWER_LETTERS:
+        raise ValueError(f"answer must be one of A-D, got {item.get('answer')!r}")
+    xp = int(item.get("xp") or base_xp(difficulty))
+    rating = int(item.get("rating") or DIFFICULTY_RATINGS[difficulty])
+    if not 0 <= xp <= MAX_XP:
+        raise ValueError(f"xp must be between 0 and {MAX_XP}, got {xp}")
+    if not 0 <= rating <= MAX_RATING:
+        raise ValueError(f"rating must be between 0 and {MAX_RATING}, got {rating}")
+    return {
+        "subject": subject,
+        "difficulty": difficulty,
+        "question": question,
+        "options": [label_option(letter, option) for letter, option in zip(ANSWER_LETTERS, options)],
+        "answer": answer,
+        "hint": str(item.get("hint") or f"Think about the key concepts in {subject}").strip(),
+        "xp": xp,
+        "rating": rating,
+    }
+
+
+def build_snapshot(questions: Iterable[Dict], path: str) -> int:
+    """Write validated questions to a snapshot file and return how many were stored"""
+    strings: Dict[str, int] = {}
+
+    def intern(text: str) -> int:
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    rows = []
+    for item in questions:
+        q = validate_question(item)
+        rows.append((
+            intern(q["subject"].lower()),
+            DIFFICULTIES.index(q["difficulty"]),
+            q["rating"],
+            intern(q["question"]),
+            [intern(option) for option in q["options"]],
+            intern(q["hint"]),
+            q["xp"],
+            ANSWER_LETTERS.index(q["answer"]),
+        ))
+    rows.sort(key=lambda row: (row[0], row[1], row[2]))
+
+    groups: List[List[int]] = []
+    for position, row in enumerate(rows):
+        if groups and groups[-1][0] == row[0] and groups[-1][1] == row[1]:
+            groups[-1][3] += 1
+        else:
+            groups.append([row[0], row[1], position, 1])
+
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets_pos = HEADER.size
+    data_pos = offsets_pos + OFFSET.size * (len(encoded) + 1)
+    records_pos = data_pos + sum(len(blob) for blob in encoded)
+    groups_pos = records_pos + RECORD.size * len(rows)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(encoded), len(rows), len(groups),
+                            offsets_pos, data_pos, records_pos, groups_pos))
+        position = 0
+        for blob in encoded:
+            f.write(OFFSET.pack(position))
+            position += len(blob)
+        f.write(OFFSET.pack(position))
+        for blob in encoded:
+            f.write(blob)
+        for subject, difficulty, rating, question, options, hint, xp, answer in rows:
+            f.write(RECORD.pack(question, *options, hint, rating, xp, answer, difficulty))
+        for group in groups:
+            f.write(GROUP.pack(*group))
+    return len(rows)
+
+
+class QuestionSnapshot:
+    """Read-only, memory-mapped view over a compiled question bank"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.n_strings, self.n_questions, n_groups,
+         self._offsets_pos, self._data_pos, self._records_pos, groups_pos) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a question bank snapshot")
+
+        # The group table is tiny (subjects x difficulties), so it lives in a dict
+        self._groups: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        for g in range(n_groups):
+            subject_id, difficulty, start, count = GROUP.unpack_from(self._map, groups_pos + g * GROUP.size)
+            self._groups.setdefault(self._string(subject_id), {})[DIFFICULTIES[difficulty]] = (start, count)
+
+    def __len__(self) -> int:
+        return self.n_questions
+
+    @property
+    def subjects(self) -> List[str]:
+        return list(self._groups)
+
+    def close(self):
+        self._map.close()
+
+    def _string(self, string_id: int) -> str:
+        start, end = struct.unpack_from("<II", self._map, self._offsets_pos + string_id * OFFSET.size)
+        return self._map[self._data_pos + start:self._data_pos + end].decode("utf-8")
+
+    def _rating(self, record_id: int) -> int:
+        return RECORD.unpack_from(self._map, self._records_pos + record_id * RECORD.size)[6]
+
+    def find_subject(self, topic: str) -> Optional[str]:
+        """Match a free-text topic to a snapshot subject"""
+        topic_lower = topic.lower().strip()
+        if topic_lower in self._groups:
+            return topic_lower
+        for subject in self._groups:
+            if subject in topic_lower or topic_lower in subject:
+                return subject
+        return None
+
+    def question(self, record_id: int) -> Question:
+        """Materialise one record as the Question used by the app"""
+        question, *options, hint, rating, xp, answer, _ = RECORD.unpack_from(
+            self._map, self._records_pos + record_id * RECORD.size)
+        return Question(
+            question=self._string(question),
+            options=tuple(self._string(option) for option in options),
+            answer=answer,
+            hint=self._string(hint),
+            xp=xp,
+            rating=rating,
+        )
+
+    def sample(self, subject: str, difficulty: str, k: int = 3) -> List[Question]:
+        """Pick k random questions, decoding only the chosen records"""
+        start, count = self._groups.get(subject, {}).get(difficulty, (0, 0))
+        picks = random.sample(range(start, start + count), min(k, count))
+        return [self.question(record_id) for record_id in picks]
+
+    def range(self, subject: str, low: float, high: float) -> List[int]:
+        """Record ids of a subject whose rating lies in [low, high] (bisect per difficulty group)"""
+        record_ids: List[int] = []
+        for start, count in self._groups.get(subject, {}).values():
+            first = self._bisect(start, start + count, low, inclusive=False)
+            last = self._bisect(first, start + count, high, inclusive=True)
+            record_ids.extend(range(first, last))
+        return record_ids
+
+    def _bisect(self, lo: int, hi: int, rating: float, inclusive: bool) -> int:
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._rating(mid)
+            if value < rating or (inclusive and value == rating):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def count(self, subject: str) -> int:
+        return sum(count for _, count in self._groups.get(subject, {}).values())
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compile a question bank into an mmap-able snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a JSONL question bank")
+    build.add_argument("source", help="JSONL file with one question per line")
+    build.add_argument("output", help="snapshot file to write")
+    info = commands.add_parser("info", help="describe a snapshot")
+    info.add_argument("snapshot")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_snapshot(read_jsonl(args.source), args.output)
+        print(f"✅ Wrote {count} questions to {args.output}")
+    else:
+        snapshot = QuestionSnapshot(args.snapshot)
+        print(f"📦 {len(snapshot)} questions, {snapshot.n_strings} unique strings")
+        for subject in snapshot.subjects:
+            print(f"  {subject}: {snapshot.count(subject)}")
+        snapshot.close()
+
+
+if __name__ == "__main__":
+    main()
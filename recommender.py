@@ -0,0 +1,189 @@
+"""
+🧭 "WHAT TO STUDY NEXT" RECOMMENDER
+Nightly batch job over the learning event history. For every active user it
+precomputes weak subjects (lowest smoothed accuracy), spaced-repetition review
+items that are due, and subjects trending in the cohort they haven't touched
+this week. Everything is computed with sparse (COO-style) NumPy aggregations
+over all users at once, and written to the recommendations table, which the
+Home tab reads with a single primary-key lookup.
+
+Usage:
+    python recommender.py                  # run nightly, e.g. from cron
+    python recommender.py --days 30 --db studyquest.db
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import storage
+
+HISTORY_DAYS = 90
+WEAK_SUBJECTS = 3
+MIN_ATTEMPTS = 3              # answers in a subject before it can be called weak
+WEAK_ACCURACY = 0.7
+DUE_ITEMS = 5
+REVIEW_INTERVALS_DAYS = np.array([1, 2, 4, 8, 16, 32])  # Leitner boxes
+TRENDING_WINDOW_DAYS = 7
+TRENDING_POOL = 10
+TRENDING_PICKS = 3
+COHORT_KEY = "*"              # fallback row for users with no recent history
+DAY = 86400
+
+
+class AnswerLog:
+    """Answer events as parallel arrays, with users / subjects / questions encoded as ints"""
+
+    def __init__(self):
+        self.users: Dict[str, int] = {}
+        self.subjects: Dict[str, int] = {}
+        self.questions: Dict[str, int] = {}
+        self._rows: Tuple[List, ...] = ([], [], [], [], [])
+
+    def __len__(self) -> int:
+        return len(self._rows[0])
+
+    def add(self, user_id: str, ts: float, subject: str, question: str, correct: bool):
+        u, t, s, q, c = self._rows
+        u.append(self.users.setdefault(user_id, len(self.users)))
+        t.append(ts)
+        s.append(self.subjects.setdefault(subject, len(self.subjects)))
+        q.append(self.questions.setdefault(question, len(self.questions)))
+        c.append(correct)
+
+    def arrays(self) -> Tuple[np.ndarray, ...]:
+        u, t, s, q, c = self._rows
+        return (np.array(u, dtype=np.int64), np.array(t, dtype=np.float64), np.array(s, dtype=np.int64),
+                np.array(q, dtype=np.int64), np.array(c, dtype=np.int8))
+
+
+def read_answers(conn, since: float, chunk_size: int = 10000) -> AnswerLog:
+    log = AnswerLog()
+    for user_id, ts, subject, question, correct in storage.iter_rows(
+            conn, "SELECT user_id, ts, subject, question, correct FROM events "
+                  "WHERE kind = 'answer' AND ts >= ? AND subject IS NOT NULL AND question IS NOT NULL",
+            (since,), chunk_size):
+        log.add(user_id, ts, subject, question, bool(correct))
+    return log
+
+
+def group_starts(sorted_keys: np.ndarray) -> np.ndarray:
+    return np.r_[0, np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1] if len(sorted_keys) else np.array([], int)
+
+
+def top_k_per_group(group: np.ndarray, score: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k lowest-score rows of every group, ordered by group then score"""
+    order = np.lexsort((score, group))
+    starts = group_starts(group[order])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return order[rank < k]
+
+
+def weak_subjects(u, s, c, n_subjects: int):
+    """(user, subject, accuracy, attempts) rows for each user's lowest-accuracy subjects"""
+    pairs, inverse = np.unique(u * n_subjects + s, return_inverse=True)
+    attempts = np.bincount(inverse)
+    accuracy = (np.bincount(inverse, weights=c) + 1) / (attempts + 2)  # Laplace-smoothed
+    weak = np.flatnonzero((attempts >= MIN_ATTEMPTS) & (accuracy < WEAK_ACCURACY))
+    picked = weak[top_k_per_group(pairs[weak] // n_subjects, accuracy[weak], WEAK_SUBJECTS)]
+    return pairs[picked] // n_subjects, pairs[picked] % n_subjects, accuracy[picked], attempts[picked]
+
+
+def due_reviews(u, t, s, q, c, n_questions: int, now: float):
+    """(user, question, subject, overdue days) for each user's most overdue review items"""
+    keys = u * n_questions + q
+    order = np.lexsort((t, keys))
+    keys, t, s, c = keys[order], t[order], s[order], c[order]
+    starts = group_starts(keys)
+    last = np.r_[starts[1:], len(keys)] - 1
+    correct = np.add.reduceat(c.astype(np.int64), starts)
+    wrong = np.diff(np.r_[starts, len(keys)]) - correct
+    box = np.clip(correct - wrong, 0, len(REVIEW_INTERVALS_DAYS) - 1)
+    interval = np.where(c[last] == 1, REVIEW_INTERVALS_DAYS[box], REVIEW_INTERVALS_DAYS[0]) * DAY
+    overdue = now - (t[last] + interval)
+    due = np.flatnonzero(overdue >= 0)
+    picked = due[top_k_per_group(keys[last][due] // n_questions, -overdue[due], DUE_ITEMS)]
+    return keys[last][picked] // n_questions, keys[last][picked] % n_questions, s[last][picked], overdue[picked] / DAY
+
+
+def trending_subjects(u, t, s, n_users: int, n_subjects: int, now: float):
+    """Cohort-wide trending pool, plus per user the pool subjects they haven't studied this week"""
+    recent = t >= now - TRENDING_WINDOW_DAYS * DAY
+    prior = ~recent & (t >= now - 2 * TRENDING_WINDOW_DAYS * DAY)
+    recent_pairs = np.unique(u[recent] * n_subjects + s[recent])
+    recent_users = np.bincount(recent_pairs % n_subjects, minlength=n_subjects)
+    prior_users = np.bincount(np.unique(u[prior] * n_subjects + s[prior]) % n_subjects, minlength=n_subjects)
+    score = recent_users * (recent_users + 1) / (prior_users + 1)  # popular and growing
+    pool = [subject for subject in np.argsort(-score, kind="stable")[:TRENDING_POOL] if recent_users[subject]]
+
+    studied = np.zeros((n_users, len(pool)), dtype=bool)
+    slot = np.full(n_subjects, -1)
+    slot[pool] = np.arange(len(pool))
+    in_pool = slot[recent_pairs % n_subjects] >= 0
+    studied[recent_pairs[in_pool] // n_subjects, slot[recent_pairs[in_pool] % n_subjects]] = True
+    picks = np.argsort(studied, axis=1, kind="stable")[:, :TRENDING_PICKS]  # unstudied first, pool order
+    valid = ~np.take_along_axis(studied, picks, axis=1)
+    return np.array(pool, dtype=np.int64), picks, valid
+
+
+def build_recommendations(log: AnswerLog, now: float) -> Iterator[Tuple[str, Dict]]:
+    u, t, s, q, c = log.arrays()
+    user_ids = list(log.users)
+    subjects = list(log.subjects)
+    questions = list(log.questions)
+    computed = datetime.fromtimestamp(now).isoformat(timespec="seconds")
+
+    pool, picks, valid = trending_subjects(u, t, s, len(user_ids), len(subjects), now)
+    yield COHORT_KEY, {"weak": [], "due": [], "trending": [subjects[i] for i in pool[:TRENDING_PICKS]],
+                       "computed_at": computed}
+    if not len(u):
+        return
+
+    weak = defaultdict(list)
+    for user, subject, accuracy, attempts in zip(*weak_subjects(u, s, c, len(subjects))):
+        weak[user].append({"subject": subjects[subject], "accuracy": round(float(accuracy), 2),
+                           "attempts": int(attempts)})
+    due = defaultdict(list)
+    for user, question, subject, overdue in zip(*due_reviews(u, t, s, q, c, len(questions), now)):
+        due[user].append({"subject": subjects[subject], "question": questions[question],
+                          "overdue_days": round(float(overdue), 1)})
+
+    for user, user_id in enumerate(user_ids):
+        yield user_id, {
+            "weak": weak.get(user, []),
+            "due": due.get(user, []),
+            "trending": [subjects[pool[pick]] for pick, ok in zip(picks[user], valid[user]) if ok],
+            "computed_at": computed,
+        }
+
+
+def run_recommender(db_path: Optional[str] = None, days: int = HISTORY_DAYS) -> Dict[str, float]:
+    started = time.perf_counter()
+    now = time.time()
+    with storage.open_db(db_path) as conn:
+        log = read_answers(conn, now - days * DAY)
+        loaded = time.perf_counter()
+        written = storage.save_recommendations(conn, build_recommendations(log, now))
+        with conn:  # users with no history in the window fall back to the cohort row
+            conn.execute("DELETE FROM recommendations WHERE computed_at < ? AND user_id != ?", (now, COHORT_KEY))
+    return {"events": len(log), "users": written - 1,
+            "load_seconds": round(loaded - started, 2), "total_seconds": round(time.perf_counter() - started, 2)}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Precompute per-user study recommendations")
+    parser.add_argument("--db", help=f"database path (default: {storage.DB_PATH})")
+    parser.add_argument("--days", type=int, default=HISTORY_DAYS, help="event history to consider")
+    args = parser.parse_args(argv)
+    totals = run_recommender(args.db, args.days)
+    print(f"✅ {totals['users']} users from {totals['events']} events in {totals['total_seconds']}s "
+          f"(loading {totals['load_seconds']}s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
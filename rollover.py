@@ -0,0 +1,157 @@
+"""
+🌙 DAILY ROLLOVER
+Batch job that starts a new day for every stored user at their own local
+midnight: daily XP goes back to 0, streaks that missed yesterday are broken and
+any badges the stored totals have earned are filled in. Users are processed per
+timezone in vectorised batches, and each user is rolled over at most once per
+local day, so the job can run from several replicas or a cron entry safely.
+
+Usage:
+    python rollover.py                 # one pass over every timezone that crossed midnight
+    python rollover.py --loop          # keep running, waking at each timezone's midnight
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+import storage
+from catalog import CATALOG_PATH, BadgeTiers, load_catalog
+from models import UserProgress, local_today
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+MAX_SLEEP = 3600  # re-check hourly so newly seen timezones get their boundary
+
+
+def roll_over_batch(rows: List[Tuple], today: int, badge_tiers: BadgeTiers) -> Tuple[List[Tuple[str, Dict, float]], List[str]]:
+    """
+    Roll over one batch of (rowid, user_id, progress_json, updated_at) rows to local day `today`
+    (a date ordinal), unlocking badges from the catalog's tiers.
+    Returns (changed rows as (user_id, progress, updated_at), unchanged user ids).
+    """
+    count = len(rows)
+    progress = [json.loads(row[2]) for row in rows]
+    column = lambda values: np.fromiter(values, dtype=np.int64, count=count)
+    last = column(date.fromisoformat(p["last_activity"]).toordinal() if p.get("last_activity") else 0
+                  for p in progress)
+    streak = column(p.get("streak", 0) for p in progress)
+    daily_xp = column(p.get("daily_xp", 0) for p in progress)
+
+    reset_daily = (daily_xp > 0) & (last < today)
+    break_streak = (streak > 0) & (last < today - 1)
+
+    # Badge tiers unlock in threshold order, so a user is missing one of a kind exactly when
+    # the tiers their totals reach outnumber the badges of that kind they hold
+    metrics = {"xp": column(p.get("total_xp", 0) for p in progress),
+               "streak": np.where(break_streak, 0, streak),
+               "subjects": column(len(p.get("subjects_studied", {})) for p in progress)}
+    missing_badges = np.zeros(count, dtype=bool)
+    for kind, tiers in badge_tiers.items():
+        earned = np.searchsorted([threshold for threshold, _, _ in tiers], metrics[kind], side="right")
+        titles = {title for _, title, _ in tiers}
+        held = column(len(titles.intersection(p.get("badges", ()))) for p in progress)
+        missing_badges |= earned > held
+
+    changed, unchanged = [], []
+    for i in range(count):
+        user_id, updated_at = rows[i][1], rows[i][3]
+        if not (reset_daily[i] or break_streak[i] or missing_badges[i]):
+            unchanged.append(user_id)
+            continue
+        user = UserProgress.from_dict(progress[i])
+        if reset_daily[i]:
+            user.daily_xp = 0
+        if break_streak[i]:
+            user.streak = 0
+        user.unlock_badges(badge_tiers)
+        changed.append((user_id, user.to_dict(), updated_at))
+    return changed, unchanged
+
+
+def run_rollover(badge_tiers: BadgeTiers, db_path: Optional[str] = None, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """One pass: every timezone whose local date moved past its users' last rollover"""
+    totals = {"users": 0, "changed": 0}
+    with storage.open_db(db_path) as conn:
+        for timezone in list(storage.iter_timezones(conn)):
+            today = local_today(timezone).toordinal()
+            after_rowid = 0
+            while True:
+                rows = storage.due_for_rollover(conn, timezone, today, after_rowid, batch_size)
+                if not rows:
+                    break
+                after_rowid = rows[-1][0]
+                changed, unchanged = roll_over_batch(rows, today, badge_tiers)
+                storage.apply_rollover(conn, today, changed, unchanged)
+                totals["users"] += len(rows)
+                totals["changed"] += len(changed)
+    return totals
+
+
+def seconds_until_next_midnight(timezones: List[str]) -> float:
+    """Time until the earliest upcoming local midnight among the given timezones"""
+    now = time.time()
+    wait = MAX_SLEEP
+    for timezone in timezones:
+        try:
+            zone = ZoneInfo(timezone)
+        except (KeyError, ValueError):
+            continue
+        local_now = datetime.fromtimestamp(now, zone)
+        midnight = datetime.combine(local_now.date() + timedelta(days=1), datetime.min.time(), zone)
+        wait = min(wait, midnight.timestamp() - now)
+    return max(1.0, wait + 1)  # land just after the boundary
+
+
+def run_forever(badge_tiers: Callable[[], BadgeTiers], db_path: Optional[str] = None,
+                stop: Optional[threading.Event] = None):
+    """badge_tiers is called on every pass, so edited catalog tiers apply from the next midnight"""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            totals = run_rollover(badge_tiers(), db_path)
+            if totals["users"]:
+                logger.info("Rolled over %(users)d users (%(changed)d changed)", totals)
+            with storage.open_db(db_path) as conn:
+                timezones = list(storage.iter_timezones(conn))
+        except Exception:
+            logger.exception("Daily rollover failed")
+            timezones = []
+        stop.wait(seconds_until_next_midnight(timezones))
+
+
+def start_rollover_thread(badge_tiers: Callable[[], BadgeTiers], db_path: Optional[str] = None) -> threading.Event:
+    """Run the rollover loop in a daemon thread; set the returned event to stop it"""
+    stop = threading.Event()
+    threading.Thread(target=run_forever, args=(badge_tiers, db_path, stop), name="daily-rollover", daemon=True).start()
+    return stop
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Roll StudyQuest users over to a new day")
+    parser.add_argument("--db", help=f"database path (default: {storage.DB_PATH})")
+    parser.add_argument("--loop", action="store_true", help="keep running, waking at each timezone's midnight")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="content catalog with the badge tiers")
+    args = parser.parse_args(argv)
+    badge_tiers = lambda: load_catalog(args.catalog).badges
+
+    if args.loop:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+        run_forever(badge_tiers, args.db)
+    else:
+        totals = run_rollover(badge_tiers(), args.db, args.batch_size)
+        print(f"✅ Rolled over {totals['users']} users ({totals['changed']} changed)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+💾 PERSISTENT STORAGE
+SQLite-backed store for user progress, learning events and imported questions.
+Everything that reads many rows streams them in chunks so exports stay in
+constant memory no matter how large the tables grow.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import UserProgress
+
+DB_PATH = os.getenv("STUDYQUEST_DB", "studyquest.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id       TEXT PRIMARY KEY,
+    progress      TEXT NOT NULL,
+    updated_at    REAL NOT NULL,
+    timezone      TEXT NOT NULL DEFAULT 'UTC',
+    rollover_day  INTEGER NOT NULL DEFAULT 0      -- local date ordinal of the last daily rollover
+);
+CREATE TABLE IF NOT EXISTS events (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id     TEXT NOT NULL,
+    ts          REAL NOT NULL,
+    kind        TEXT NOT NULL,
+    subject     TEXT,
+    question    TEXT,
+    correct     INTEGER,
+    xp          INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS events_user ON events (user_id, ts);
+CREATE TABLE IF NOT EXISTS pending_awards (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id     TEXT NOT NULL,
+    subject     TEXT NOT NULL,
+    xp          INTEGER NOT NULL,
+    day         TEXT NOT NULL                   -- the user's local date when it was earned
+);
+CREATE INDEX IF NOT EXISTS pending_awards_user ON pending_awards (user_id);
+CREATE TABLE IF NOT EXISTS recommendations (
+    user_id      TEXT PRIMARY KEY,
+    payload      TEXT NOT NULL,
+    computed_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quests (
+    hash        TEXT PRIMARY KEY,               -- content hash, so users served the same quest share one row
+    topic       TEXT NOT NULL,
+    difficulty  TEXT NOT NULL,
+    questions   TEXT NOT NULL,
+    sources     TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_quests (
+    user_id     TEXT NOT NULL,
+    quest_hash  TEXT NOT NULL,
+    state       TEXT NOT NULL,                  -- answered options, correct set, results, page
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (user_id, quest_hash)
+);
+CREATE INDEX IF NOT EXISTS user_quests_recent ON user_quests (user_id, updated_at);
+CREATE INDEX IF NOT EXISTS user_quests_hash ON user_quests (quest_hash);
+CREATE TABLE IF NOT EXISTS questions (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    subject     TEXT NOT NULL,
+    difficulty  TEXT NOT NULL,
+    question    TEXT NOT NULL,
+    options     TEXT NOT NULL,
+    answer      TEXT NOT NULL,
+    hint        TEXT NOT NULL,
+    xp          INTEGER NOT NULL,
+    rating      INTEGER NOT NULL,
+    UNIQUE (subject, question)
+);
+"""
+
+
+@contextmanager
+def open_db(path: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(path or DB_PATH, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        migrate(conn)
+        yield conn
+    finally:
+        conn.close()
+
+
+def migrate(conn: sqlite3.Connection):
+    """Add columns introduced after a database was created"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+    with conn:
+        if "timezone" not in columns:
+            conn.execute("ALTER TABLE users ADD COLUMN timezone TEXT NOT NULL DEFAULT 'UTC'")
+        if "rollover_day" not in columns:
+            conn.execute("ALTER TABLE users ADD COLUMN rollover_day INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS users_rollover ON users (timezone, rollover_day)")
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# 👤 USER PROGRESS
+def load_progress(conn: sqlite3.Connection, user_id: str) -> Optional[UserProgress]:
+    row = conn.execute("SELECT progress FROM users WHERE user_id = ?", (user_id,)).fetchone()
+    return UserProgress.from_dict(json.loads(row[0])) if row else None
+
+
+def save_progress(conn: sqlite3.Connection, user_id: str, progress: UserProgress):
+    """
+    Upsert a user's progress. If the daily rollover reached this row after `progress` was loaded,
+    its resets and badges are applied to `progress` (in place) first, so a session left open over
+    midnight can't write yesterday's daily XP and streak back over the rolled-over row
+    """
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")  # no rollover write between the read and the upsert
+        row = conn.execute("SELECT progress, rollover_day FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        if row and row[1]:
+            progress.catch_up_rollover(date.fromordinal(row[1]), json.loads(row[0]).get("badges", []))
+        conn.execute(
+            "INSERT INTO users (user_id, progress, updated_at, timezone) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET progress = excluded.progress, updated_at = excluded.updated_at, "
+            "timezone = excluded.timezone",
+            (user_id, json.dumps(progress.to_dict()), time.time(), progress.timezone),
+        )
+
+
+def record_event(conn: sqlite3.Connection, user_id: str, kind: str, subject: Optional[str] = None,
+                 question: Optional[str] = None, correct: Optional[bool] = None, xp: int = 0):
+    record_events(conn, user_id, [(kind, subject, question, correct, xp)])
+
+
+def record_events(conn: sqlite3.Connection, user_id: str, events: Iterable[Tuple]):
+    """Insert (kind, subject, question, correct, xp) events in a single transaction"""
+    now = time.time()
+    with conn:
+        conn.executemany(
+            "INSERT INTO events (user_id, ts, kind, subject, question, correct, xp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(user_id, now, kind, subject, question, None if correct is None else int(correct), xp)
+             for kind, subject, question, correct, xp in events],
+        )
+
+
+# ⏱️ PENDING AWARDS - XP earned in the background, merged into progress by the user's session
+def user_timezone(conn: sqlite3.Connection, user_id: str) -> str:
+    row = conn.execute("SELECT timezone FROM users WHERE user_id = ?", (user_id,)).fetchone()
+    return row[0] if row else "UTC"
+
+
+def queue_award(conn: sqlite3.Connection, user_id: str, subject: str, xp: int, day: str):
+    with conn:
+        conn.execute("INSERT INTO pending_awards (user_id, subject, xp, day) VALUES (?, ?, ?, ?)",
+                     (user_id, subject, xp, day))
+
+
+def take_awards(conn: sqlite3.Connection, user_id: str) -> List[Tuple[str, int, str]]:
+    """Remove and return the user's queued (subject, xp, day) awards; each is handed out exactly once"""
+    with conn:
+        rows = conn.execute("DELETE FROM pending_awards WHERE user_id = ? RETURNING id, subject, xp, day",
+                            (user_id,)).fetchall()
+    return [(subject, xp, day) for _, subject, xp, day in sorted(rows)]
+
+
+# 📤 STREAMING READS
+def iter_rows(conn: sqlite3.Connection, sql: str, params: Tuple = (), chunk_size: int = 1000) -> Iterator[sqlite3.Row]:
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def iter_progress(conn: sqlite3.Connection, chunk_size: int = 1000) -> Iterator[Dict]:
+    for user_id, progress, updated_at in iter_rows(
+            conn, "SELECT user_id, progress, updated_at FROM users ORDER BY user_id", chunk_size=chunk_size):
+        yield {"user_id": user_id, "updated_at": updated_at, **json.loads(progress)}
+
+
+def iter_events(conn: sqlite3.Connection, since: float = 0, chunk_size: int = 1000) -> Iterator[Dict]:
+    columns = ("id", "user_id", "ts", "kind", "subject", "question", "correct", "xp")
+    for row in iter_rows(conn, f"SELECT {', '.join(columns)} FROM events WHERE ts >= ? ORDER BY id",
+                         (since,), chunk_size):
+        event = dict(zip(columns, row))
+        if event["correct"] is not None:
+            event["correct"] = bool(event["correct"])
+        yield event
+
+
+def iter_questions(conn: sqlite3.Connection, chunk_size: int = 1000) -> Iterator[Dict]:
+    columns = ("subject", "difficulty", "question", "options", "answer", "hint", "xp", "rating")
+    for row in iter_rows(conn, f"SELECT {', '.join(columns)} FROM questions ORDER BY id", chunk_size=chunk_size):
+        question = dict(zip(columns, row))
+        question["options"] = json.loads(question["options"])
+        yield question
+
+
+# 🌙 DAILY ROLLOVER
+def iter_timezones(conn: sqlite3.Connection) -> Iterator[str]:
+    yield from (row[0] for row in conn.execute("SELECT DISTINCT timezone FROM users"))
+
+
+def due_for_rollover(conn: sqlite3.Connection, timezone: str, day: int, after_rowid: int = 0,
+                     limit: int = 5000) -> list:
+    """Next batch of (rowid, user_id, progress, updated_at) in a timezone not yet rolled over to day"""
+    return conn.execute(
+        "SELECT rowid, user_id, progress, updated_at FROM users "
+        "WHERE timezone = ? AND rollover_day < ? AND rowid > ? ORDER BY rowid LIMIT ?",
+        (timezone, day, after_rowid, limit),
+    ).fetchall()
+
+
+def apply_rollover(conn: sqlite3.Connection, day: int, changed: Iterable[Tuple[str, Dict, float]],
+                   unchanged: Iterable[str]) -> int:
+    """
+    Write rolled-over progress in one transaction. A row saved by a live session since it was
+    read (updated_at moved) is left alone and retried on the next pass; returns rows written.
+    """
+    now = time.time()
+    with conn:
+        written = conn.executemany(
+            "UPDATE users SET progress = ?, updated_at = ?, rollover_day = ? WHERE user_id = ? AND updated_at = ?",
+            [(json.dumps(progress), now, day, user_id, updated_at) for user_id, progress, updated_at in changed],
+        ).rowcount
+        written += conn.executemany(
+            "UPDATE users SET rollover_day = ? WHERE user_id = ?", [(day, user_id) for user_id in unchanged]
+        ).rowcount
+    return written
+
+
+# 🧭 RECOMMENDATIONS - precomputed nightly, read with one primary-key lookup
+def load_recommendations(conn: sqlite3.Connection, user_id: str) -> Optional[Dict]:
+    row = conn.execute("SELECT payload FROM recommendations WHERE user_id = ?", (user_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def save_recommendations(conn: sqlite3.Connection, rows: Iterable[Tuple[str, Dict]], batch_size: int = 5000) -> int:
+    """Upsert (user_id, payload) rows, one transaction per batch; returns rows written"""
+    written = 0
+    for batch in batched(rows, batch_size):
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT INTO recommendations (user_id, payload, computed_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET payload = excluded.payload, computed_at = excluded.computed_at",
+                [(user_id, json.dumps(payload), now) for user_id, payload in batch],
+            )
+        written += len(batch)
+    return written
+
+
+# 🗂️ QUEST HISTORY - each user's recent quests, with quest content stored once per hash
+def quest_hash(topic: str, difficulty: str, questions: List[Dict]) -> str:
+    payload = json.dumps([topic, difficulty, questions], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def save_quest(conn: sqlite3.Connection, user_id: str, topic: str, difficulty: str, questions: List[Dict],
+               sources: List[str], state: Dict, keep: int = 5) -> str:
+    """Store the quest's content (once per hash), make it this user's latest and forget all but `keep`"""
+    digest = quest_hash(topic, difficulty, questions)
+    now = time.time()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO quests (hash, topic, difficulty, questions, sources, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (digest, topic, difficulty, json.dumps(questions), json.dumps(sources), now),
+        )
+        conn.execute(
+            "INSERT INTO user_quests (user_id, quest_hash, state, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (user_id, quest_hash) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+            (user_id, digest, json.dumps(state), now),
+        )
+        dropped = [row[0] for row in conn.execute(
+            "SELECT quest_hash FROM user_quests WHERE user_id = ? ORDER BY updated_at DESC LIMIT -1 OFFSET ?",
+            (user_id, keep))]
+        for old_hash in dropped:
+            conn.execute("DELETE FROM user_quests WHERE user_id = ? AND quest_hash = ?", (user_id, old_hash))
+            conn.execute("DELETE FROM quests WHERE hash = ? AND NOT EXISTS "
+                         "(SELECT 1 FROM user_quests WHERE quest_hash = ?)", (old_hash, old_hash))
+    return digest
+
+
+def save_quest_state(conn: sqlite3.Connection, user_id: str, digest: str, state: Dict):
+    with conn:
+        conn.execute("UPDATE user_quests SET state = ?, updated_at = ? WHERE user_id = ? AND quest_hash = ?",
+                     (json.dumps(state), time.time(), user_id, digest))
+
+
+def recent_quests(conn: sqlite3.Connection, user_id: str, limit: int = 5) -> List[Dict]:
+    """The user's latest quests, newest first, with their saved state but without the questions"""
+    rows = conn.execute(
+        "SELECT q.hash, q.topic, q.difficulty, u.state FROM user_quests u JOIN quests q ON q.hash = u.quest_hash "
+        "WHERE u.user_id = ? ORDER BY u.updated_at DESC LIMIT ?", (user_id, limit))
+    return [{"hash": digest, "topic": topic, "difficulty": difficulty, "state": json.loads(state)}
+            for digest, topic, difficulty, state in rows]
+
+
+def load_quest(conn: sqlite3.Connection, user_id: str, digest: str) -> Optional[Dict]:
+    row = conn.execute(
+        "SELECT q.topic, q.difficulty, q.questions, q.sources, u.state FROM quests q "
+        "LEFT JOIN user_quests u ON u.quest_hash = q.hash AND u.user_id = ? WHERE q.hash = ?", (user_id, digest)).fetchone()
+    if row is None:
+        return None
+    topic, difficulty, questions, sources, state = row
+    return {"hash": digest, "topic": topic, "difficulty": difficulty, "questions": json.loads(questions),
+            "sources": json.loads(sources), "state": json.loads(state) if state else None}
+
+
+def find_questions(conn: sqlite3.Connection, user_id: str, texts: List[str]) -> Dict[str, Dict]:
+    """Question dicts by question text, from the user's stored quests first, then the imported bank"""
+    wanted = list(dict.fromkeys(texts))
+    found: Dict[str, Dict] = {}
+    if not wanted:
+        return found
+    rows = conn.execute(
+        "SELECT j.value FROM user_quests u JOIN quests q ON q.hash = u.quest_hash, json_each(q.questions) j "
+        f"WHERE u.user_id = ? AND json_extract(j.value, '$.question') IN ({','.join('?' * len(wanted))})",
+        (user_id, *wanted))
+    for (value,) in rows:
+        item = json.loads(value)
+        found.setdefault(item["question"], item)
+    missing = [text for text in wanted if text not in found]
+    if missing:
+        rows = conn.execute(
+            "SELECT question, options, answer, hint, xp, rating FROM questions "
+            f"WHERE question IN ({','.join('?' * len(missing))})", missing)
+        for question, options, answer, hint, xp, rating in rows:
+            found.setdefault(question, {"question": question, "options": json.loads(options), "answer": answer,
+                                        "hint": hint, "xp": xp, "rating": rating})
+    return found
+
+
+# 📥 BULK WRITES
+def insert_questions(conn: sqlite3.Connection, questions: Iterable[Dict], batch_size: int = 5000) -> int:
+    """Upsert validated questions, one transaction per batch; returns rows written"""
+    written = 0
+    for batch in batched(questions, batch_size):
+        with conn:
+            conn.executemany(
+                "INSERT INTO questions (subject, difficulty, question, options, answer, hint, xp, rating) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (subject, question) DO UPDATE SET difficulty = excluded.difficulty, "
+                "options = excluded.options, answer = excluded.answer, hint = excluded.hint, "
+                "xp = excluded.xp, rating = excluded.rating",
+                [(q["subject"], q["difficulty"], q["question"], json.dumps(q["options"]),
+                  q["answer"], q["hint"], q["xp"], q["rating"]) for q in batch],
+            )
+        written += len(batch)
+    return written